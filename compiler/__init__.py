@@ -2,4 +2,14 @@
 
 from .lexer import tokenize
 from .parser import parse
-from .evaluator import evaluate, default_env, run_program
+
+# Evaluator exports resolve on first access, so front-end-only users
+# (htc tokenize/parse/compile) never pay for importing the evaluator
+_EVALUATOR_EXPORTS = ("evaluate", "default_env", "run_program")
+
+
+def __getattr__(name):
+    if name in _EVALUATOR_EXPORTS:
+        from . import evaluator
+        return getattr(evaluator, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,15 +7,29 @@ Usage (via CLI):
     python3 -m compiler.htc bench                    # Run all benchmark pairs
     python3 -m compiler.htc bench --category commands # Filter by category
     python3 -m compiler.htc bench --verbose           # Show per-pair details
+    python3 -m compiler.htc bench --cache             # Reuse counts from disk
 """
 
+import hashlib
 import json
 import os
+import sqlite3
+from collections import namedtuple
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 
 try:
-    import tiktoken
+    import orjson
 except ImportError:
-    tiktoken = None
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 
 # Default encoding — cl100k_base is used by GPT-4, GPT-3.5-turbo
@@ -26,71 +40,251 @@ _BENCHMARKS_PATH = os.path.join(
     "benchmarks", "pairs.json",
 )
 
+# Pairs files larger than this are streamed (when ijson is installed)
+# instead of being parsed into memory whole
+_STREAM_THRESHOLD = 16 * 1024 * 1024
+
+# Pairs encoded per batch call when streaming
+_BATCH_SIZE = 1024
 
-def _get_encoder():
-    """Get tiktoken encoder, raising a clear error if not installed."""
-    if tiktoken is None:
+# Opt-in on-disk token-count cache (bench --cache)
+_COUNT_CACHE_PATH = os.path.join(os.path.expanduser("~/.hivespeak"), "bench_tokens.sqlite")
+
+
+@lru_cache(maxsize=4)
+def _get_encoder(name=_ENCODING_NAME):
+    """Get tiktoken encoder, raising a clear error if not installed.
+
+    Cached per encoding name — loading the BPE merge tables is expensive,
+    so it happens once per process. tiktoken is imported here rather than
+    at module load so importing compiler.bench stays cheap.
+    """
+    try:
+        import tiktoken
+    except ImportError:
         raise RuntimeError(
             "tiktoken is required for benchmarking. Install: pip install tiktoken"
-        )
-    return tiktoken.get_encoding(_ENCODING_NAME)
+        ) from None
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=100_000)
+def _count(encoder, text):
+    """Memoized token count — repeated strings across pairs skip BPE."""
+    return len(encoder.encode_ordinary(text))
+
+
+# Default encoder, bound on first count_tokens call without an explicit one
+_default_encoder = None
 
 
 def count_tokens(text, encoder=None):
-    """Count BPE tokens in a string."""
+    """Count BPE tokens in a string (special-token markers count as plain text)."""
+    global _default_encoder
     if encoder is None:
-        encoder = _get_encoder()
-    return len(encoder.encode(text))
+        if _default_encoder is None:
+            _default_encoder = _get_encoder()
+        encoder = _default_encoder
+    return _count(encoder, text)
+
+
+@lru_cache(maxsize=8)
+def _load_pairs_cached(path, mtime):
+    """Parse a pairs file once per (path, mtime). Returns a tuple of dicts."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if orjson is not None:
+        return tuple(orjson.loads(data))
+    return tuple(json.loads(data.decode("utf-8")))
 
 
 def load_pairs(path=None):
-    """Load benchmark pairs from JSON file."""
-    path = path or _BENCHMARKS_PATH
-    with open(path, "r") as f:
-        return json.load(f)
+    """Load benchmark pairs from JSON file.
+
+    The parse is cached until the file changes; callers get fresh shallow
+    copies so mutating a pair never leaks into the cache.
+    """
+    path = os.path.abspath(path or _BENCHMARKS_PATH)
+    return [dict(p) for p in _load_pairs_cached(path, os.path.getmtime(path))]
+
+
+def iter_pairs(path=None):
+    """Yield benchmark pairs one at a time.
+
+    Large files are streamed with ijson so memory stays flat; everything
+    else goes through the cached load_pairs.
+    """
+    path = os.path.abspath(path or _BENCHMARKS_PATH)
+    if ijson is not None and os.path.getsize(path) > _STREAM_THRESHOLD:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "item")
+    else:
+        yield from load_pairs(path)
+
+
+# Pair fields that get token-counted, in result order
+_TEXT_FIELDS = (
+    "english", "hivespeak_verbose", "hivespeak_shorthand", "hivespeak_compressed",
+)
+
+# Per-pair result row. Only raw counts are stored; savings are derived on
+# demand by _pair_savings, since most reports only need the aggregates.
+BenchResult = namedtuple(
+    "BenchResult",
+    "id category english_tokens verbose_tokens shorthand_tokens compressed_tokens",
+)
+
+# The four token-count columns of a BenchResult
+_counts = itemgetter(2, 3, 4, 5)
+
+
+def _pair_result(pair, eng_tokens, verbose_tokens, shorthand_tokens, compressed_tokens):
+    """Build a BenchResult for a pair from its four token counts."""
+    return BenchResult(
+        pair["id"], pair["category"],
+        eng_tokens, verbose_tokens, shorthand_tokens, compressed_tokens,
+    )
+
+
+def _savings(eng, tokens):
+    """Fraction of English tokens saved (negative when HiveSpeak is longer)."""
+    return 1 - (tokens / eng) if eng else 0
+
+
+def _savings3(eng, verb, short, comp):
+    """(verbose, shorthand, compressed) savings from four token counts."""
+    return _savings(eng, verb), _savings(eng, short), _savings(eng, comp)
+
+
+def _pair_savings(r):
+    """(verbose, shorthand, compressed) savings for one result."""
+    return _savings3(*_counts(r))
 
 
 def bench_pair(pair, encoder):
-    """Benchmark a single English/HiveSpeak pair. Returns a result dict."""
-    eng_tokens = count_tokens(pair["english"], encoder)
-    verbose_tokens = count_tokens(pair["hivespeak_verbose"], encoder)
-    shorthand_tokens = count_tokens(pair["hivespeak_shorthand"], encoder)
-    compressed_tokens = count_tokens(pair["hivespeak_compressed"], encoder)
-
-    return {
-        "id": pair["id"],
-        "category": pair["category"],
-        "english_tokens": eng_tokens,
-        "verbose_tokens": verbose_tokens,
-        "shorthand_tokens": shorthand_tokens,
-        "compressed_tokens": compressed_tokens,
-        "verbose_ratio": eng_tokens / verbose_tokens if verbose_tokens else 0,
-        "shorthand_ratio": eng_tokens / shorthand_tokens if shorthand_tokens else 0,
-        "compressed_ratio": eng_tokens / compressed_tokens if compressed_tokens else 0,
-        "verbose_savings": 1 - (verbose_tokens / eng_tokens) if eng_tokens else 0,
-        "shorthand_savings": 1 - (shorthand_tokens / eng_tokens) if eng_tokens else 0,
-        "compressed_savings": 1 - (compressed_tokens / eng_tokens) if eng_tokens else 0,
-    }
+    """Benchmark a single English/HiveSpeak pair. Returns a BenchResult."""
+    return _pair_result(pair, *(count_tokens(pair[f], encoder) for f in _TEXT_FIELDS))
+
+
+def _text_key(encoder, text):
+    """Stable cache key for a (encoding, text) pair."""
+    name = getattr(encoder, "name", type(encoder).__name__)
+    return hashlib.blake2b(f"{name}\0{text}".encode(), digest_size=16).digest()
+
+
+_COUNT_TABLE_SQL = "CREATE TABLE IF NOT EXISTS counts (key BLOB PRIMARY KEY, tokens INTEGER)"
+
+
+def _read_count_cache(path):
+    """Load the on-disk count cache. Returns {key: token_count}.
+
+    A file that isn't a usable cache reads as empty, so counts are redone.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with closing(sqlite3.connect(path)) as db:
+            db.execute(_COUNT_TABLE_SQL)
+            return dict(db.execute("SELECT key, tokens FROM counts"))
+    except sqlite3.DatabaseError:
+        return {}
+
+
+def _write_count_cache(path, known):
+    """Persist {key: token_count} to the on-disk cache.
+
+    A file that isn't an sqlite database is replaced.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        _store_counts(path, known)
+    except sqlite3.DatabaseError:
+        os.remove(path)
+        _store_counts(path, known)
+
 
+def _store_counts(path, known):
+    with closing(sqlite3.connect(path)) as db, db:
+        db.execute(_COUNT_TABLE_SQL)
+        db.executemany("INSERT OR REPLACE INTO counts VALUES (?, ?)", known.items())
 
-def run_benchmark(category=None, pairs_path=None):
-    """Run benchmarks on all pairs (or filtered by category). Returns results list + summary."""
+
+def bench_pairs(pairs, encoder, known=None):
+    """Benchmark many pairs with one batched encode call. Returns BenchResults.
+
+    All 4N strings go to tiktoken in a single encode_ordinary_batch call,
+    which runs BPE on Rust threads instead of crossing into the extension
+    once per string. Encoders without a batch API are fanned out over a
+    thread pool instead (tiktoken releases the GIL while encoding).
+
+    `known` is an optional {key: token_count} cache (see _text_key); hits
+    skip encoding and new counts are added to it.
+    """
+    texts = [p[f] for p in pairs for f in _TEXT_FIELDS]
+    # Encode each distinct string once
+    unique = list(dict.fromkeys(texts))
+    by_text = {}
+    if known is not None:
+        keys = {t: _text_key(encoder, t) for t in unique}
+        by_text = {t: known[k] for t, k in keys.items() if k in known}
+        unique = [t for t in unique if t not in by_text]
+    workers = os.cpu_count() or 1
+    if hasattr(encoder, "encode_ordinary_batch"):
+        lens = [len(t) for t in encoder.encode_ordinary_batch(unique, num_threads=workers)]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            lens = list(ex.map(lambda t: count_tokens(t, encoder), unique))
+    by_text.update(zip(unique, lens))
+    if known is not None:
+        known.update((keys[t], n) for t, n in zip(unique, lens))
+    counts = [by_text[t] for t in texts]
+    w = len(_TEXT_FIELDS)
+    return [_pair_result(p, *counts[i * w:(i + 1) * w]) for i, p in enumerate(pairs)]
+
+
+def _column_sums(rows, width):
+    """Sum equal-length tuples column-wise. Returns a list of `width` totals.
+
+    zip/sum keep the whole table reduction in C — a column-wise sum
+    without pulling in NumPy for a few hundred rows.
+    """
+    sums = [sum(col) for col in zip(*rows)]
+    return sums or [0] * width
+
+
+def run_benchmark(category=None, pairs_path=None, cache_path=None):
+    """Run benchmarks on all pairs (or filtered by category). Returns results list + summary.
+
+    With cache_path, token counts are read from and written back to an
+    sqlite cache so unchanged strings are not re-encoded on later runs.
+    """
     encoder = _get_encoder()
-    pairs = load_pairs(pairs_path)
+    pairs = iter_pairs(pairs_path)
+    known = _read_count_cache(cache_path) if cache_path else None
+    known_before = len(known) if known is not None else 0
 
     if category:
-        pairs = [p for p in pairs if p["category"] == category]
+        pairs = (p for p in pairs if p["category"] == category)
 
-    results = [bench_pair(p, encoder) for p in pairs]
+    # Encode in fixed-size batches so a streamed file is never held whole
+    results = []
+    while True:
+        batch = list(islice(pairs, _BATCH_SIZE))
+        if not batch:
+            break
+        results.extend(bench_pairs(batch, encoder, known))
+
+    if known is not None and len(known) > known_before:
+        _write_count_cache(cache_path, known)
 
     # Aggregate stats
-    total_eng = sum(r["english_tokens"] for r in results)
-    total_verbose = sum(r["verbose_tokens"] for r in results)
-    total_shorthand = sum(r["shorthand_tokens"] for r in results)
-    total_compressed = sum(r["compressed_tokens"] for r in results)
+    total_eng, total_verbose, total_shorthand, total_compressed = _column_sums(
+        map(_counts, results), 4)
+    sum_v_sav, sum_s_sav, sum_c_sav = _column_sums(map(_pair_savings, results), 3)
+    n = len(results)
 
     summary = {
-        "pair_count": len(results),
+        "pair_count": n,
         "total_english_tokens": total_eng,
         "total_verbose_tokens": total_verbose,
         "total_shorthand_tokens": total_shorthand,
@@ -98,63 +292,57 @@ def run_benchmark(category=None, pairs_path=None):
         "overall_verbose_ratio": total_eng / total_verbose if total_verbose else 0,
         "overall_shorthand_ratio": total_eng / total_shorthand if total_shorthand else 0,
         "overall_compressed_ratio": total_eng / total_compressed if total_compressed else 0,
-        "overall_verbose_savings": 1 - (total_verbose / total_eng) if total_eng else 0,
-        "overall_shorthand_savings": 1 - (total_shorthand / total_eng) if total_eng else 0,
-        "overall_compressed_savings": 1 - (total_compressed / total_eng) if total_eng else 0,
-        "avg_verbose_savings": (
-            sum(r["verbose_savings"] for r in results) / len(results) if results else 0
-        ),
-        "avg_shorthand_savings": (
-            sum(r["shorthand_savings"] for r in results) / len(results) if results else 0
-        ),
-        "avg_compressed_savings": (
-            sum(r["compressed_savings"] for r in results) / len(results) if results else 0
-        ),
+        "overall_verbose_savings": _savings(total_eng, total_verbose),
+        "overall_shorthand_savings": _savings(total_eng, total_shorthand),
+        "overall_compressed_savings": _savings(total_eng, total_compressed),
+        "avg_verbose_savings": sum_v_sav / n if n else 0,
+        "avg_shorthand_savings": sum_s_sav / n if n else 0,
+        "avg_compressed_savings": sum_c_sav / n if n else 0,
     }
 
     return results, summary
 
 
+# Report separators
+_RULE = "=" * 72
+_RULE_WIDE = "=" * 86
+_DASH = "-" * 72
+_DASH_WIDE = "-" * 86
+
+# Row templates for the per-pair and per-category tables
+_PAIR_ROW = "{:<25} {:<12} {:>5} {:>5} {:>5} {:>5} {:>6.0%} {:>6.0%} {:>6.0%}"
+_CAT_ROW = "  {:<15} {:>5} {:>6} {:>6} {:>6} {:>6} {:>6.0%} {:>6.0%} {:>6.0%}"
+
+
 def format_report(results, summary, verbose=False):
     """Format benchmark results as a readable report string."""
     lines = []
-    lines.append("=" * 72)
+    lines.append(_RULE)
     lines.append("HiveSpeak Token Compression Benchmark")
     lines.append(f"Encoding: {_ENCODING_NAME}  |  Pairs: {summary['pair_count']}")
-    lines.append("=" * 72)
+    lines.append(_RULE)
 
     if verbose:
         lines.append("")
         lines.append(f"{'ID':<25} {'Cat':<12} {'Eng':>5} {'Verb':>5} {'Short':>5} {'Comp':>5} {'V.Sav':>7} {'S.Sav':>7} {'C.Sav':>7}")
-        lines.append("-" * 86)
+        lines.append(_DASH_WIDE)
+        row = _PAIR_ROW.format
         for r in results:
-            lines.append(
-                f"{r['id']:<25} {r['category']:<12} "
-                f"{r['english_tokens']:>5} {r['verbose_tokens']:>5} {r['shorthand_tokens']:>5} {r['compressed_tokens']:>5} "
-                f"{r['verbose_savings']:>6.0%} {r['shorthand_savings']:>6.0%} {r['compressed_savings']:>6.0%}"
-            )
-        lines.append("-" * 86)
-
-    # Per-category summary
-    categories = sorted(set(r["category"] for r in results))
-    if len(categories) > 1:
+            lines.append(row(r.id, r.category, *_counts(r), *_pair_savings(r)))
+        lines.append(_DASH_WIDE)
+
+    # Per-category summary — group in one pass
+    by_cat = {}
+    for r in results:
+        by_cat.setdefault(r.category, []).append(r)
+    if len(by_cat) > 1:
         lines.append("")
         lines.append("By Category:")
         lines.append(f"  {'Category':<15} {'Pairs':>5} {'Eng':>6} {'Verb':>6} {'Short':>6} {'Comp':>6} {'V.Sav':>7} {'S.Sav':>7} {'C.Sav':>7}")
-        lines.append("  " + "-" * 72)
-        for cat in categories:
-            cat_results = [r for r in results if r["category"] == cat]
-            eng = sum(r["english_tokens"] for r in cat_results)
-            verb = sum(r["verbose_tokens"] for r in cat_results)
-            short = sum(r["shorthand_tokens"] for r in cat_results)
-            comp = sum(r["compressed_tokens"] for r in cat_results)
-            v_sav = 1 - (verb / eng) if eng else 0
-            s_sav = 1 - (short / eng) if eng else 0
-            c_sav = 1 - (comp / eng) if eng else 0
-            lines.append(
-                f"  {cat:<15} {len(cat_results):>5} {eng:>6} {verb:>6} {short:>6} {comp:>6} "
-                f"{v_sav:>6.0%} {s_sav:>6.0%} {c_sav:>6.0%}"
-            )
+        lines.append("  " + _DASH)
+        for cat, cat_results in sorted(by_cat.items()):
+            totals = _column_sums(map(_counts, cat_results), 4)
+            lines.append(_CAT_ROW.format(cat, len(cat_results), *totals, *_savings3(*totals)))
 
     # Overall summary
     lines.append("")
@@ -171,6 +359,6 @@ def format_report(results, summary, verbose=False):
     lines.append(f"  Avg verbose savings per pair:     {summary['avg_verbose_savings']:.1%}")
     lines.append(f"  Avg shorthand savings per pair:   {summary['avg_shorthand_savings']:.1%}")
     lines.append(f"  Avg compressed savings per pair:  {summary['avg_compressed_savings']:.1%}")
-    lines.append("=" * 86)
+    lines.append(_RULE_WIDE)
 
     return "\n".join(lines)
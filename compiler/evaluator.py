@@ -1,17 +1,24 @@
 """HiveSpeak Evaluator — interprets AST nodes in an environment.
 
 Architecture: data-driven dispatch via dicts.
+- Node evaluation: dict mapping AST tag -> handler(node, env)
 - Special forms: dict mapping name -> handler(args_ast, env)
 - Built-in ops: dict mapping name -> handler(evaluated_args)
 - Environment: dict with {"__parent__": parent_env, ...bindings}
+- Compilation: compile_node turns AST into run(env) closures once; fn
+  values carry their compiled body
 
 No OOP. Pure functions + lookup tables.
 """
 
 import hashlib
-import json
+import math
+import operator
 import sys
 import time
+from collections import Counter
+from functools import lru_cache, reduce
+from itertools import chain
 
 # ─── Environment ───────────────────────────────────────────────────────────
 
@@ -23,10 +30,12 @@ def make_env(parent=None, bindings=None):
 
 
 def env_get(env, name, loc=None):
-    if name in env and name != "__parent__":
-        return env[name]
-    if env.get("__parent__"):
-        return env_get(env["__parent__"], name, loc)
+    # Walk the parent chain iteratively; "__parent__" is the link, never a binding
+    if name != "__parent__":
+        while env is not None:
+            if name in env:
+                return env[name]
+            env = env.get("__parent__")
     loc_s = f" at line {loc[0]}, col {loc[1]}" if loc else ""
     raise NameError(f"Undefined symbol: {name}{loc_s}")
 
@@ -38,13 +47,34 @@ def env_set(env, name, value):
 
 def env_find(env, name):
     """Find the env frame that contains name (for mutation)."""
-    if name in env and name != "__parent__":
-        return env
-    if env.get("__parent__"):
-        return env_find(env["__parent__"], name)
+    if name != "__parent__":
+        while env is not None:
+            if name in env:
+                return env
+            env = env.get("__parent__")
     return None
 
 
+# ─── Keywords ──────────────────────────────────────────────────────────────
+
+# Keyword values are ("KW", name) pairs, pooled so each name has one shared
+# tuple. Map keys normalize keywords to their bare name string.
+_KW_POOL = {}
+
+
+def kw(name):
+    """Return the shared keyword value for name."""
+    v = _KW_POOL.get(name)
+    if v is None:
+        v = _KW_POOL.setdefault(name, ("KW", name))
+    return v
+
+
+def _map_key(k):
+    """Normalize a map key: keyword -> bare name, anything else unchanged."""
+    return k[1] if type(k) is tuple and k[0] == "KW" else k
+
+
 # ─── AST helpers ───────────────────────────────────────────────────────────
 
 def node_type(n):  return n[0]
@@ -64,59 +94,47 @@ def _loc_str(node):
 
 def evaluate(node, env):
     """Evaluate an AST node in an environment. Returns a value."""
-    nt = node_type(node)
-
-    # Literals — return value directly
-    if nt in _LITERAL_TYPES:
-        return _LITERAL_TYPES[nt](node)
+    try:
+        handler = _EVAL_DISPATCH[node[0]]
+    except KeyError:
+        raise RuntimeError(f"Cannot evaluate node type: {node[0]}{_loc_str(node)}") from None
+    return handler(node, env)
 
-    # Symbol — env lookup
-    if nt == "SYM":
-        return env_get(env, node[1], node_loc(node))
 
-    # Keyword — self-evaluating
-    if nt == "KW":
-        return ("KW", node[1])
+def _eval_map(node, env):
+    """Map literal — evaluate alternating key/value pairs."""
+    elements = node[1]
+    result = {}
+    i = 0
+    while i < len(elements) - 1:
+        k = evaluate(elements[i], env)
+        v = evaluate(elements[i + 1], env)
+        result[_map_key(k)] = v
+        i += 2
+    return result
 
-    # Hash ref — self-evaluating
-    if nt == "HASH":
-        return ("HASH", node[1])
 
+# Node tag -> handler(node, env). One dict probe per node instead of an
+# if-chain of string compares.
+_EVAL_DISPATCH = {
+    # Literals — return value directly
+    "INT":   lambda n, e: n[1],
+    "FLOAT": lambda n, e: n[1],
+    "STR":   lambda n, e: n[1],
+    "BOOL":  lambda n, e: n[1],
+    "NULL":  lambda n, e: None,
+    # Symbol — env lookup
+    "SYM":   lambda n, e: env_get(e, n[1], node_loc(n)),
+    # Keyword / hash ref — self-evaluating
+    "KW":    lambda n, e: kw(n[1]),
+    "HASH":  lambda n, e: ("HASH", n[1]),
     # List literal — evaluate all elements
-    if nt == "LIST":
-        return [evaluate(el, env) for el in node[1]]
-
-    # Map literal — evaluate alternating key/value pairs
-    if nt == "MAP":
-        elements = node[1]
-        result = {}
-        i = 0
-        while i < len(elements) - 1:
-            k = evaluate(elements[i], env)
-            v = evaluate(elements[i + 1], env)
-            # Normalize keyword keys to strings
-            key = k[1] if isinstance(k, tuple) and k[0] == "KW" else k
-            result[key] = v
-            i += 2
-        return result
-
+    "LIST":  lambda n, e: [evaluate(el, e) for el in n[1]],
+    "MAP":   _eval_map,
     # Quote — return unevaluated
-    if nt == "QUOTE":
-        return _ast_to_data(node[1])
-
+    "QUOTE": lambda n, e: _ast_to_data(n[1]),
     # S-expression — function call or special form
-    if nt == "SEXPR":
-        return _eval_sexpr(node[1], env, node)
-
-    raise RuntimeError(f"Cannot evaluate node type: {nt}{_loc_str(node)}")
-
-
-_LITERAL_TYPES = {
-    "INT":   lambda n: n[1],
-    "FLOAT": lambda n: n[1],
-    "STR":   lambda n: n[1],
-    "BOOL":  lambda n: n[1],
-    "NULL":  lambda n: None,
+    "SEXPR": lambda n, e: _eval_sexpr(n[1], e, n),
 }
 
 
@@ -128,16 +146,13 @@ def _eval_sexpr(elements, env, sexpr_node=None):
     head = elements[0]
     args = elements[1:]
 
-    # Check if head is a special form symbol
-    if node_type(head) == "SYM" and head[1] in _SPECIAL_FORMS:
-        return _SPECIAL_FORMS[head[1]](args, env)
-
-    # Check if head is a macro — macros receive unevaluated AST args
-    if node_type(head) == "SYM":
-        try:
-            head_val = env_get(env, head[1], node_loc(head))
-        except NameError:
-            raise
+    if head[0] == "SYM":
+        # Special form — one dict probe resolves the handler
+        special = _SPECIAL_FORMS.get(head[1])
+        if special is not None:
+            return special(args, env)
+        # Macros receive unevaluated AST args
+        head_val = env_get(env, head[1], node_loc(head))
         if isinstance(head_val, tuple) and head_val[0] == "MACRO":
             return _expand_and_eval_macro(head_val, args, env)
         # Not a macro — evaluate args and apply
@@ -196,22 +211,15 @@ def _substitute_ast(node, subs):
 
 def apply_fn(fn_val, args, env, loc=None):
     """Apply a function value to evaluated arguments."""
-    loc_s = f" at line {loc[0]}, col {loc[1]}" if loc else ""
+    # User-defined function: ("FN", params, body, closure_env, body_run, frame)
+    if type(fn_val) is tuple and fn_val[0] == "FN":
+        return fn_val[4](fn_val[5](args, fn_val[3]))
 
     # Built-in function
     if callable(fn_val):
         return fn_val(*args)
 
-    # User-defined function: ("FN", params, body, closure_env)
-    if isinstance(fn_val, tuple) and fn_val[0] == "FN":
-        _, params, body_nodes, closure_env = fn_val
-        fn_env = make_env(closure_env)
-        _bind_params(params, args, fn_env)
-        result = None
-        for node in body_nodes:
-            result = evaluate(node, fn_env)
-        return result
-
+    loc_s = f" at line {loc[0]}, col {loc[1]}" if loc else ""
     # Macro (shouldn't be applied directly after eval, but handle gracefully)
     if isinstance(fn_val, tuple) and fn_val[0] == "MACRO":
         raise RuntimeError(f"Macros cannot be applied as values{loc_s}")
@@ -219,20 +227,45 @@ def apply_fn(fn_val, args, env, loc=None):
     raise RuntimeError(f"Not callable: {fn_val}{loc_s}")
 
 
-def _bind_params(params, args, env):
-    """Bind parameter names to argument values in env. Handles & rest params."""
-    i = 0
-    while i < len(params):
-        if params[i] == "&":
-            # Rest param: bind remaining args as list
-            if i + 1 < len(params):
-                env_set(env, params[i + 1], list(args[i:]))
-            return
-        if i < len(args):
-            env_set(env, params[i], args[i])
-        else:
-            env_set(env, params[i], None)
-        i += 1
+def _make_binder(params):
+    """Scan params once; return frame(args, parent) -> new call env.
+
+    Missing args bind to N; with `& rest`, remaining args bind as a list.
+    Small fixed arities build the env as one dict literal.
+    """
+    rest = None
+    if "&" in params:
+        k = params.index("&")
+        if k + 1 < len(params):
+            rest = params[k + 1]
+        params = params[:k]
+    names = tuple(params)
+    n = len(names)
+
+    def frame(args, parent):
+        env = {"__parent__": parent}
+        env.update(zip(names, args))
+        if len(args) < n:
+            env.update(dict.fromkeys(names[len(args):]))
+        if rest is not None:
+            env[rest] = list(args[n:])
+        return env
+
+    if rest is not None or n > 2:
+        return frame
+    if n == 0:
+        return lambda args, parent: {"__parent__": parent}
+    if n == 1:
+        p, = names
+        return lambda args, parent: {"__parent__": parent, p: args[0]} if args else frame(args, parent)
+    p, q = names
+    return lambda args, parent: ({"__parent__": parent, p: args[0], q: args[1]}
+                                 if len(args) > 1 else frame(args, parent))
+
+
+def _fn_value(params, body, env):
+    """Build a user function value, precompiling its body and param binder."""
+    return ("FN", params, body, env, compile_body(body), _make_binder(params))
 
 
 # ─── Special Forms ─────────────────────────────────────────────────────────
@@ -245,8 +278,7 @@ def _sf_def(args, env):
         name = parts[0][1]
         params = [p[1] for p in parts[1:]]
         body = args[1:]
-        fn_val = ("FN", params, body, env)
-        return env_set(env, name, fn_val)
+        return env_set(env, name, _fn_value(params, body, env))
     # Simple binding: (def name value)
     name = args[0][1]
     value = evaluate(args[1], env)
@@ -276,7 +308,7 @@ def _sf_fn(args, env):
     params_node = args[0]
     params = [p[1] for p in params_node[1]]
     body = args[1:]
-    return ("FN", params, body, env)
+    return _fn_value(params, body, env)
 
 
 def _sf_if(args, env):
@@ -438,6 +470,15 @@ def _sf_mod(args, env):
     return env_set(env, name, mod)
 
 
+def _read_module_file(path):
+    """Default (use "file") loader: source text, or None if the file is missing."""
+    import os
+    if not os.path.exists(path):
+        return None
+    from compiler.lexer import read_source
+    return read_source(path)
+
+
 def _use_file(path, import_args, env, loc=None):
     """Load and execute a .ht file, importing its definitions into env."""
     import os
@@ -459,17 +500,19 @@ def _use_file(path, import_args, env, loc=None):
         return None  # already loaded
     loaded.add(path)
 
-    if not os.path.exists(path):
+    # Sources come from the nearest "__file_loader__" binding up the env
+    # chain (path -> text, or None if missing), e.g. an in-memory module
+    # table; else from disk
+    frame = env_find(env, "__file_loader__")
+    loader = frame["__file_loader__"] if frame is not None else _read_module_file
+    source = loader(path)
+    if source is None:
         raise RuntimeError(f"File not found: {path}{loc_s}")
 
-    from compiler.lexer import tokenize
+    from compiler.lexer import tokenize_iter
     from compiler.parser import parse
 
-    with open(path, "r") as f:
-        source = f.read()
-
-    tokens = tokenize(source)
-    ast_nodes = parse(tokens)
+    ast_nodes = parse(tokenize_iter(source))
 
     # Create a module env that can see builtins but collects new defs
     mod_env = make_env(env)
@@ -530,10 +573,15 @@ def _sf_use(args, env):
 _PACKET_STORE = {}
 
 
+def _hive_hash(obj, _blake2b=hashlib.blake2b):
+    """12-hex-char content id for cells, packets and the hash builtin."""
+    return _blake2b(str(obj).encode(), digest_size=6).hexdigest()
+
+
 def _sf_cell(args, env):
     """(cell state-map) — create a cell"""
     state = evaluate(args[0], env)
-    cell_id = hashlib.sha256(json.dumps(str(state)).encode()).hexdigest()[:12]
+    cell_id = _hive_hash(state)
     return {"__type__": "cell", "id": cell_id, "state": state, "inbox": []}
 
 
@@ -541,13 +589,13 @@ def _sf_emit(args, env):
     """(emit cell :target target content) or (emit cell :broadcast content)"""
     cell = evaluate(args[0], env)
     mode = evaluate(args[1], env)
-    if isinstance(mode, tuple) and mode[0] == "KW" and mode[1] == "target":
+    if mode == kw("target"):
         target = evaluate(args[2], env)
         content = evaluate(args[3], env)
         if isinstance(target, dict) and target.get("__type__") == "cell":
             target["inbox"].append({"from": cell.get("id"), "content": content})
         return content
-    if isinstance(mode, tuple) and mode[0] == "KW" and mode[1] == "broadcast":
+    if mode == kw("broadcast"):
         content = evaluate(args[2], env)
         return content
     # Simple form: (emit cell target content)
@@ -571,13 +619,14 @@ def _sf_merge(args, env):
     cells = evaluate(args[0], env)
     on_keys = None
     if len(args) > 2:
-        on_keys = evaluate(args[2], env)
+        # Normalize the key filter once rather than per state entry
+        on_keys = [x[1] if isinstance(x, tuple) else x for x in evaluate(args[2], env)]
     merged = {}
     for c in cells:
         if isinstance(c, dict) and c.get("__type__") == "cell":
             state = c.get("state", {})
             for k, v in state.items():
-                if on_keys is None or k in [x[1] if isinstance(x, tuple) else x for x in on_keys]:
+                if on_keys is None or k in on_keys:
                     if k not in merged:
                         merged[k] = []
                     merged[k].append(v)
@@ -594,18 +643,11 @@ def _sf_compress(args, env):
     compressed = {}
     for k, values in shared.items():
         if values:
-            # Most frequent value wins
-            counts = {}
-            for v in values:
-                key = str(v)
-                counts[key] = counts.get(key, 0) + 1
-            winner = max(counts, key=counts.get)
-            # Find original value
-            for v in values:
-                if str(v) == winner:
-                    compressed[k] = v
-                    break
-    pkt_hash = hashlib.sha256(json.dumps(str(compressed)).encode()).hexdigest()[:12]
+            # Most frequent str() form wins (ties: first seen); keep the original
+            keys = list(map(str, values))
+            winner = Counter(keys).most_common(1)[0][0]
+            compressed[k] = values[keys.index(winner)]
+    pkt_hash = _hive_hash(compressed)
     packet = {"__type__": "packet", "hash": pkt_hash, "data": compressed}
     _PACKET_STORE[pkt_hash] = packet
     return {"ok": packet}
@@ -623,7 +665,7 @@ def _sf_ref(args, env):
 def _sf_packet(args, env):
     """(packet data) — create packet from data"""
     data = evaluate(args[0], env)
-    pkt_hash = hashlib.sha256(json.dumps(str(data)).encode()).hexdigest()[:12]
+    pkt_hash = _hive_hash(data)
     packet = {"__type__": "packet", "hash": pkt_hash, "data": data}
     _PACKET_STORE[pkt_hash] = packet
     return packet
@@ -705,6 +747,9 @@ _SPECIAL_FORMS = {
     "-":  _sf_intent("reject"),
 }
 
+# Interned to match symbol names from the lexer (see _BUILTINS)
+_SPECIAL_FORMS = {sys.intern(k): v for k, v in _SPECIAL_FORMS.items()}
+
 
 # ─── Built-in Functions ────────────────────────────────────────────────────
 
@@ -718,22 +763,22 @@ def _truthy(v):
 
 
 def _ht_type(v):
-    if v is None:          return ("KW", "null")
-    if isinstance(v, bool): return ("KW", "bool")
-    if isinstance(v, int):  return ("KW", "int")
-    if isinstance(v, float): return ("KW", "float")
-    if isinstance(v, str):  return ("KW", "str")
-    if isinstance(v, list): return ("KW", "list")
+    if v is None:          return kw("null")
+    if isinstance(v, bool): return kw("bool")
+    if isinstance(v, int):  return kw("int")
+    if isinstance(v, float): return kw("float")
+    if isinstance(v, str):  return kw("str")
+    if isinstance(v, list): return kw("list")
     if isinstance(v, dict):
         t = v.get("__type__")
-        if t: return ("KW", t)
-        return ("KW", "map")
+        if t: return kw(t)
+        return kw("map")
     if isinstance(v, tuple):
-        if v[0] == "FN":  return ("KW", "fn")
-        if v[0] == "KW":  return ("KW", "keyword")
-        if v[0] == "HASH": return ("KW", "hash")
-    if callable(v):        return ("KW", "fn")
-    return ("KW", "unknown")
+        if v[0] == "FN":  return kw("fn")
+        if v[0] == "KW":  return kw("keyword")
+        if v[0] == "HASH": return kw("hash")
+    if callable(v):        return kw("fn")
+    return kw("unknown")
 
 
 def _ht_print(*args):
@@ -748,12 +793,12 @@ def _format_val(v):
     if v is False:             return "F"
     if isinstance(v, str):     return v
     if isinstance(v, (int, float)): return str(v)
-    if isinstance(v, list):    return "[" + " ".join(_format_val(x) for x in v) + "]"
+    if isinstance(v, list) or (isinstance(v, dict) and not v.get("__type__")):
+        out = []
+        _format_into(v, out)
+        return "".join(out)
     if isinstance(v, dict):
-        if v.get("__type__"):
-            return f"<{v['__type__']} {v.get('id', v.get('hash', ''))}>"
-        pairs = " ".join(f":{k} {_format_val(val)}" for k, val in v.items())
-        return "{" + pairs + "}"
+        return f"<{v['__type__']} {v.get('id', v.get('hash', ''))}>"
     if isinstance(v, tuple):
         if v[0] == "FN":      return "<fn>"
         if v[0] == "MACRO":   return "<macro>"
@@ -763,18 +808,51 @@ def _format_val(v):
     return str(v)
 
 
-# Arithmetic — variadic
-def _arith(op, identity):
+def _format_into(v, out):
+    """Append the display pieces of a (nested) list/map to out; one join at the top."""
+    if isinstance(v, list):
+        out.append("[")
+        sep = False
+        for x in v:
+            if sep:
+                out.append(" ")
+            sep = True
+            _format_into(x, out)
+        out.append("]")
+    elif isinstance(v, dict) and not v.get("__type__"):
+        out.append("{")
+        sep = False
+        for k, val in v.items():
+            out.append(f" :{k} " if sep else f":{k} ")
+            sep = True
+            _format_into(val, out)
+        out.append("}")
+    else:
+        out.append(_format_val(v))
+
+
+# Arithmetic — variadic. With an operator.* op the fold runs entirely in C;
+# `fast(head, rest)`, when given, takes over for int/float heads (sum and
+# math.prod have unboxed int/float loops). Strings, lists etc. still fold.
+def _arith(op, identity, fast=None):
     def handler(*args):
         if len(args) == 1:
             return op(identity, args[0])
-        result = args[0]
-        for a in args[1:]:
-            result = op(result, a)
-        return result
+        head = args[0]
+        if fast is not None and (type(head) is int or type(head) is float):
+            return fast(head, args[1:])
+        return reduce(op, args[1:], head)
     return handler
 
 
+def _add_fast(head, rest):
+    # sum() is exact over ints, but from 3.12 it compensates float sums,
+    # which would diverge from the left fold (and the transpiled ht_add)
+    if type(head) is int and all(type(x) is int for x in rest):
+        return sum(rest, head)
+    return reduce(operator.add, rest, head)
+
+
 # Comparison — binary
 def _cmp(op):
     def handler(a, b):
@@ -783,41 +861,83 @@ def _cmp(op):
 
 
 def _ht_fmt(template, *args):
-    result = template
-    for a in args:
-        result = result.replace("{}", _format_val(a), 1)
-    return result
+    # One split + join; placeholders beyond len(args) stay in the last part
+    parts = template.split("{}", len(args))
+    out = [parts[0]]
+    for a, part in zip(args, parts[1:]):
+        out.append(_format_val(a))
+        out.append(part)
+    return "".join(out)
+
+
+# Higher-order builtins: f is resolved once to a plain Python callable, so
+# the per-element loop runs in C (map/filter/reduce) without apply_fn.
+
+def _fn_caller(f, arity):
+    """Return a Python callable taking `arity` args for fn value f."""
+    if callable(f):
+        return f
+    if isinstance(f, tuple) and f[0] == "FN":
+        _, params, _body, closure, body_run, frame = f
+        # Exact-arity plain params: skip the args tuple and frame call
+        if len(params) == arity and "&" not in params:
+            if arity == 1:
+                p, = params
+                return lambda x: body_run({"__parent__": closure, p: x})
+            if arity == 2:
+                p, q = params
+                return lambda a, b: body_run({"__parent__": closure, p: a, q: b})
+
+        return lambda *args: body_run(frame(args, closure))
+    # Not a function: let apply_fn raise on first use
+    return lambda *args: apply_fn(f, list(args), None)
 
 
 def _ht_map(f, lst):
-    return [apply_fn(f, [x], None) for x in lst]
+    return list(map(_fn_caller(f, 1), lst))
 
 
 def _ht_flt(f, lst):
-    return [x for x in lst if _truthy(apply_fn(f, [x], None))]
+    call, truthy = _fn_caller(f, 1), _truthy
+    return [x for x in lst if truthy(call(x))]
 
 
 def _ht_red(f, init, lst):
-    acc = init
-    for x in lst:
-        acc = apply_fn(f, [acc, x], None)
-    return acc
+    return reduce(_fn_caller(f, 2), lst, init)
 
 
 def _ht_any(f, lst):
-    return any(_truthy(apply_fn(f, [x], None)) for x in lst)
+    return any(map(_truthy, map(_fn_caller(f, 1), lst)))
 
 
 def _ht_all(f, lst):
-    return all(_truthy(apply_fn(f, [x], None)) for x in lst)
+    return all(map(_truthy, map(_fn_caller(f, 1), lst)))
 
 
 def _ht_srt(lst, key=None):
     if key:
-        return sorted(lst, key=lambda x: apply_fn(key, [x], None))
+        return sorted(lst, key=_fn_caller(key, 1))
     return sorted(lst)
 
 
+def _memo(fn, maxsize=1024):
+    """Cache a pure builtin on hashable args; unhashable args run uncached.
+
+    typed=True keeps 1, 1.0 and T apart (their str() forms differ). Floats
+    are never cached: 0.0 == -0.0 would share one entry despite str() "-0.0".
+    """
+    cached = lru_cache(maxsize=maxsize, typed=True)(fn)
+
+    def call(*args):
+        if any(type(a) is float for a in args):
+            return fn(*args)
+        try:
+            return cached(*args)
+        except TypeError:
+            return fn(*args)
+    return call
+
+
 def _ht_read_file(path):
     with open(path, "r") as f:
         return f.read()
@@ -832,19 +952,19 @@ def _ht_write_file(path, data):
 # Built-in function registry — flat dict, data-driven
 _BUILTINS = {
     # Arithmetic
-    "add":  _arith(lambda a, b: a + b, 0),
-    "sub":  _arith(lambda a, b: a - b, 0),
-    "*":    _arith(lambda a, b: a * b, 1),
+    "add":  _arith(operator.add, 0, _add_fast),
+    "sub":  _arith(operator.sub, 0),
+    "*":    _arith(operator.mul, 1, lambda head, rest: math.prod(rest, start=head)),
     "/":    _arith(lambda a, b: a / b if b != 0 else float('inf'), 1),
     "%":    lambda a, b: a % b,
 
     # Comparison
-    "=":    _cmp(lambda a, b: a == b),
-    "!=":   _cmp(lambda a, b: a != b),
-    "<":    _cmp(lambda a, b: a < b),
-    "gt":   _cmp(lambda a, b: a > b),
-    "<=":   _cmp(lambda a, b: a <= b),
-    ">=":   _cmp(lambda a, b: a >= b),
+    "=":    _cmp(operator.eq),
+    "!=":   _cmp(operator.ne),
+    "<":    _cmp(operator.lt),
+    "gt":   _cmp(operator.gt),
+    "<=":   _cmp(operator.le),
+    ">=":   _cmp(operator.ge),
 
     # Logic
     "and":  lambda a, b: a if not _truthy(a) else b,
@@ -866,28 +986,33 @@ _BUILTINS = {
     "tl":   lambda a: a[1:] if a else [],
     "nth":  lambda a, i: a[i] if 0 <= i < len(a) else None,
     "push": lambda a, v: a + [v],
+    # In-place append: O(1) instead of copying, for accumulating in loops
+    "push!": lambda a, v: (a.append(v), a)[-1],
     "map":  _ht_map,
     "flt":  _ht_flt,
     "red":  _ht_red,
     "srt":  _ht_srt,
-    "rev":  lambda a: list(reversed(a)),
-    "zip":  lambda *lists: [list(x) for x in zip(*lists)],
-    "flat": lambda a: [x for sub in a for x in (sub if isinstance(sub, list) else [sub])],
+    "rev":  lambda a: a[::-1] if type(a) is list else list(reversed(a)),
+    "zip":  lambda *lists: list(map(list, zip(*lists))),
+    "flat": lambda a: list(chain.from_iterable(x if type(x) is list else (x,) for x in a)),
     "uniq": lambda a: list(dict.fromkeys(a)),
     "any":  _ht_any,
     "all":  _ht_all,
     "range": lambda *args: list(range(*args)),
 
     # Map
-    "get":  lambda m, k: m.get(k[1] if isinstance(k, tuple) and k[0] == "KW" else k),
-    "put":  lambda m, k, v: {**m, **(
-        {k[1]: v} if isinstance(k, tuple) and k[0] == "KW" else {k: v}
-    )},
-    "del":  lambda m, k: {key: val for key, val in m.items() if key != (k[1] if isinstance(k, tuple) and k[0] == "KW" else k)},
-    "keys": lambda m: [("KW", k) if isinstance(k, str) else k for k in m.keys() if k != "__type__"],
+    "get":  lambda m, k: m.get(_map_key(k)),
+    "put":  lambda m, k, v: {**m, _map_key(k): v},
+    "del":  lambda m, k: {key: val for key, val in m.items() if key != _map_key(k)},
+    "keys": lambda m: [kw(k) if isinstance(k, str) else k for k in m if k != "__type__"],
     "vals": lambda m: [v for k, v in m.items() if k != "__type__"],
-    "has":  lambda m, k: (k[1] if isinstance(k, tuple) and k[0] == "KW" else k) in m,
+    "has":  lambda m, k: _map_key(k) in m,
     "mrg":  lambda a, b: {**a, **b},
+    # In-place variants: no per-call copy of the map, for folding state in
+    # loop/red. Only use on maps nothing else still reads as a snapshot.
+    "put!": lambda m, k, v: (m.__setitem__(_map_key(k), v), m)[-1],
+    "del!": lambda m, k: (m.pop(_map_key(k), None), m)[-1],
+    "mrg!": lambda a, b: (a.update(b), a)[-1],
 
     # Type
     "type":   _ht_type,
@@ -913,11 +1038,364 @@ _BUILTINS = {
     "int":   lambda v: int(v),
     "float": lambda v: float(v),
     "time":  lambda: time.time(),
-    "hash":  lambda v: hashlib.sha256(str(v).encode()).hexdigest()[:12],
+    "hash":  _memo(_hive_hash),
 
     # State helpers
     "get-state": lambda c: c.get("state") if isinstance(c, dict) else None,
-    "set-state": lambda c, k, v: (c["state"].update({k[1] if isinstance(k, tuple) and k[0] == "KW" else k: v}), c["state"])[-1],
+    "set-state": lambda c, k, v: (c["state"].update({_map_key(k): v}), c["state"])[-1],
+}
+
+# Intern registry names (operators like "int?" are not auto-interned) so
+# they match the interned symbol names coming from the lexer
+_BUILTINS = {sys.intern(k): v for k, v in _BUILTINS.items()}
+
+
+# ─── Closure compilation ──────────────────────────────────────────────────
+#
+# compile_node turns an AST node into a closure run(env) -> value once, so
+# re-running it (function bodies, top-level forms) skips per-node tag
+# dispatch. Special forms without a dedicated compiler fall back to their
+# tree-walking handler from _SPECIAL_FORMS, resolved at compile time.
+
+def compile_node(node):
+    """Compile an AST node into a closure run(env) -> value."""
+    compiler = _COMPILE_DISPATCH.get(node[0])
+    if compiler is None:
+        # Defer the error to run time, matching evaluate()
+        return lambda env: evaluate(node, env)
+    return compiler(node)
+
+
+def compile_body(nodes, tail=None):
+    """Compile a node sequence into run(env) -> value of the last (N if empty).
+
+    tail, if given, compiles the last node (see _compile_tail).
+    """
+    runs = [compile_node(n) for n in nodes]
+    if tail is not None and nodes:
+        runs[-1] = tail(nodes[-1])
+    if not runs:
+        return lambda env: None
+    if len(runs) == 1:
+        return runs[0]
+
+    def run(env):
+        result = None
+        for r in runs:
+            result = r(env)
+        return result
+    return run
+
+
+def _compile_const(node):
+    v = node[1]
+    return lambda env: v
+
+
+def _compile_sym(node):
+    name, loc = node[1], node_loc(node)
+    if name == "__parent__":
+        return lambda env: env_get(env, name, loc)
+
+    def run(env):
+        e = env
+        while e is not None:
+            if name in e:
+                return e[name]
+            e = e.get("__parent__")
+        return env_get(env, name, loc)  # raises NameError
+    return run
+
+
+def _compile_self(node):
+    # Keywords and hash refs evaluate to an immutable (TAG, name) pair
+    v = kw(node[1]) if node[0] == "KW" else (node[0], node[1])
+    return lambda env: v
+
+
+def _compile_list(node):
+    runs = [compile_node(el) for el in node[1]]
+    return lambda env: [r(env) for r in runs]
+
+
+def _compile_map(node):
+    els = node[1]
+    pairs = [(compile_node(els[i]), compile_node(els[i + 1]))
+             for i in range(0, len(els) - 1, 2)]
+
+    def run(env):
+        result = {}
+        for kr, vr in pairs:
+            k = kr(env)
+            v = vr(env)
+            result[_map_key(k)] = v
+        return result
+    return run
+
+
+def _compile_quote(node):
+    inner = node[1]
+    return lambda env: _ast_to_data(inner)
+
+
+def _compile_sexpr(node):
+    elements = node[1]
+    if not elements:
+        return lambda env: None
+    head, args = elements[0], elements[1:]
+
+    if head[0] == "SYM" and head[1] in _SPECIAL_FORMS:
+        compiler = _SF_COMPILERS.get(head[1])
+        run = compiler(args) if compiler else None
+        if run is None:
+            handler = _SPECIAL_FORMS[head[1]]
+            return lambda env: handler(args, env)
+        return run
+
+    loc = node_loc(head)
+    arg_runs = [compile_node(a) for a in args]
+
+    head_run = _compile_sym(head) if head[0] == "SYM" else compile_node(head)
+    macros = head[0] == "SYM"
+
+    def run(env):
+        fn = head_run(env)
+        # Inline apply_fn for the common cases: one type check picks the path
+        if type(fn) is tuple:
+            tag = fn[0]
+            if tag == "FN":
+                return fn[4](fn[5]([r(env) for r in arg_runs], fn[3]))
+            # Macros (by symbol) receive unevaluated AST args
+            if tag == "MACRO" and macros:
+                return _expand_and_eval_macro(fn, args, env)
+        elif callable(fn):
+            return fn(*[r(env) for r in arg_runs])
+        return apply_fn(fn, [r(env) for r in arg_runs], env, loc)
+    return run
+
+
+_COMPILE_DISPATCH = {
+    "INT":   _compile_const,
+    "FLOAT": _compile_const,
+    "STR":   _compile_const,
+    "BOOL":  _compile_const,
+    "NULL":  lambda n: (lambda env: None),
+    "SYM":   _compile_sym,
+    "KW":    _compile_self,
+    "HASH":  _compile_self,
+    "LIST":  _compile_list,
+    "MAP":   _compile_map,
+    "QUOTE": _compile_quote,
+    "SEXPR": _compile_sexpr,
+}
+
+
+# Special-form compilers: args_ast -> run(env), or None to fall back to the
+# tree-walking handler (used for malformed forms so errors stay the same).
+
+def _c_def(args):
+    if len(args) < 2 and not (args and args[0][0] == "SEXPR"):
+        return None
+    if args[0][0] == "SEXPR":
+        parts = args[0][1]
+        if not parts:
+            return None
+        name = parts[0][1]
+        params = [p[1] for p in parts[1:]]
+        body = args[1:]
+        body_run, frame = compile_body(body), _make_binder(params)
+        return lambda env: env_set(env, name, ("FN", params, body, env, body_run, frame))
+    name = args[0][1]
+    value_run = compile_node(args[1])
+    return lambda env: env_set(env, name, value_run(env))
+
+
+def _c_fn(args):
+    if not args or not isinstance(args[0][1], list):
+        return None
+    params = [p[1] for p in args[0][1]]
+    body = args[1:]
+    body_run, frame = compile_body(body), _make_binder(params)
+    return lambda env: ("FN", params, body, env, body_run, frame)
+
+
+def _c_let(args, tail=None):
+    if not args or not isinstance(args[0][1], list):
+        return None
+    pairs = args[0][1]
+    binds = [(pairs[i][1], compile_node(pairs[i + 1]))
+             for i in range(0, len(pairs) - 1, 2)]
+    body_run = compile_body(args[1:], tail)
+
+    def run(env):
+        let_env = make_env(env)
+        for name, vr in binds:
+            let_env[name] = vr(let_env)
+        return body_run(let_env)
+    return run
+
+
+def _c_if(args, tail=compile_node):
+    if len(args) < 2:
+        return None
+    cond, then = compile_node(args[0]), tail(args[1])
+    if len(args) > 2:
+        other = tail(args[2])
+        return lambda env: then(env) if _truthy(cond(env)) else other(env)
+    return lambda env: then(env) if _truthy(cond(env)) else None
+
+
+def _c_pipe(args):
+    if not args or any(st[0] == "SEXPR" and not st[1] for st in args[1:]):
+        return None
+    head = compile_node(args[0])
+    # (f a b) step -> (f_run, [a_run, b_run]); bare step -> (f_run, ())
+    steps = [(compile_node(st[1][0]), [compile_node(a) for a in st[1][1:]])
+             if st[0] == "SEXPR" else (compile_node(st), ())
+             for st in args[1:]]
+
+    def run(env):
+        val = head(env)
+        for fn_run, arg_runs in steps:
+            fn_val = fn_run(env)
+            step_args = [r(env) for r in arg_runs]
+            step_args.append(val)
+            val = apply_fn(fn_val, step_args, env)
+        return val
+    return run
+
+
+def _c_use(args):
+    # File imports keep the tree handler (load-once bookkeeping, error paths)
+    if not args or args[0][0] == "STR":
+        return None
+    first = args[0]
+    mod_name, mod_run = first[1], _compile_sym(first)
+    names = [(a[1], a) for a in args[1:]]
+
+    def run(env):
+        mod = mod_run(env)
+        if not isinstance(mod, dict):
+            raise RuntimeError(f"{mod_name} is not a module{_loc_str(first)}")
+        if not names:
+            env.update(mod)
+            return None
+        for name, a in names:
+            if name not in mod:
+                raise RuntimeError(f"{name} not found in module {mod_name}{_loc_str(a)}")
+            env[name] = mod[name]
+        return None
+    return run
+
+
+# Patterns whose value is a compile-time constant (see _ast_to_data)
+_LITERAL_PATTERNS = {"INT", "FLOAT", "STR", "BOOL", "NULL", "KW"}
+
+
+def _c_match(args, tail=compile_node):
+    if not args:
+        return None
+    scrut = compile_node(args[0])
+    arms = [(args[i], args[i + 1]) for i in range(1, len(args) - 1, 2)]
+    is_wild = lambda p: p[0] == "SYM" and p[1] == "_"
+
+    if all(p[0] in _LITERAL_PATTERNS or is_wild(p) for p, _ in arms):
+        # Jump table: first arm wins for equal keys, arms after _ are dead
+        table, default = {}, None
+        for pat, res in arms:
+            if is_wild(pat):
+                default = tail(res)
+                break
+            table.setdefault(_ast_to_data(pat), tail(res))
+
+        def run(env):
+            v = scrut(env)
+            try:
+                branch = table.get(v, default)
+            except TypeError:  # unhashable value never equals a literal
+                branch = default
+            return branch(env) if branch is not None else None
+        return run
+
+    compiled = [(None if is_wild(p) else compile_node(p), tail(r)) for p, r in arms]
+
+    def run_linear(env):
+        v = scrut(env)
+        for pat, res in compiled:
+            if pat is None or pat(env) == v:
+                return res(env)
+        return None
+    return run_linear
+
+
+# loop/recur: a recur in tail position of the loop body returns a
+# (_RECUR, values) sentinel to the loop driver instead of raising. recur
+# anywhere else (or inside forms without a compiler, e.g. try) still
+# raises _Recur, which the driver also accepts.
+
+_RECUR = object()
+
+
+def _compile_tail(node):
+    """Compile node in loop-tail position, propagating through if/do/let/match."""
+    if node[0] == "SEXPR" and node[1] and node[1][0][0] == "SYM":
+        compiler = _TAIL_COMPILERS.get(node[1][0][1])
+        run = compiler(node[1][1:]) if compiler else None
+        if run is not None:
+            return run
+    return compile_node(node)
+
+
+def _c_recur_tail(args):
+    runs = [compile_node(a) for a in args]
+    return lambda env: (_RECUR, [r(env) for r in runs])
+
+
+def _c_loop(args):
+    if not args or not isinstance(args[0][1], list):
+        return None
+    pairs = args[0][1]
+    names = [pairs[i][1] for i in range(0, len(pairs) - 1, 2)]
+    inits = [compile_node(pairs[i + 1]) for i in range(0, len(pairs) - 1, 2)]
+    body_run = compile_body(args[1:], _compile_tail)
+
+    def run(env):
+        loop_env = make_env(env)
+        values = [r(loop_env) for r in inits]
+        while True:
+            for name, v in zip(names, values):
+                loop_env[name] = v
+            try:
+                result = body_run(loop_env)
+            except _Recur as r:
+                values = r.values
+                continue
+            if type(result) is tuple and len(result) == 2 and result[0] is _RECUR:
+                values = result[1]
+                continue
+            return result
+    return run
+
+
+_TAIL_COMPILERS = {
+    "recur": _c_recur_tail,
+    "if":    lambda args: _c_if(args, _compile_tail),
+    "do":    lambda args: compile_body(args, _compile_tail),
+    "let":   lambda args: _c_let(args, _compile_tail),
+    "match": lambda args: _c_match(args, _compile_tail),
+}
+
+
+_SF_COMPILERS = {
+    "def":   _c_def,
+    "fn":    _c_fn,
+    "let":   _c_let,
+    "if":    _c_if,
+    "do":    compile_body,
+    "loop":  _c_loop,
+    "match": _c_match,
+    "use":   _c_use,
+    "|>":    _c_pipe,
 }
 
 
@@ -925,39 +1403,38 @@ _BUILTINS = {
 
 def _ast_to_data(node):
     """Convert AST node to runtime data (for quote)."""
-    nt = node_type(node)
-    if nt in ("INT", "FLOAT", "STR", "BOOL"):
-        return node[1]
-    if nt == "NULL":
-        return None
-    if nt == "SYM":
-        return ("SYM", node[1])
-    if nt == "KW":
-        return ("KW", node[1])
-    if nt == "HASH":
-        return ("HASH", node[1])
-    if nt == "LIST":
-        return [_ast_to_data(el) for el in node[1]]
-    if nt == "MAP":
-        result = {}
-        i = 0
-        els = node[1]
-        while i < len(els) - 1:
-            k = _ast_to_data(els[i])
-            v = _ast_to_data(els[i + 1])
-            key = k[1] if isinstance(k, tuple) and k[0] == "KW" else k
-            result[key] = v
-            i += 2
-        return result
-    if nt == "SEXPR":
-        return [_ast_to_data(el) for el in node[1]]
-    if nt == "QUOTE":
-        return ["quote", _ast_to_data(node[1])]
-    if nt == "UNQUOTE":
-        return ["unquote", _ast_to_data(node[1])]
-    if nt == "SPLICE":
-        return ["splice", _ast_to_data(node[1])]
-    return node
+    handler = _TO_DATA.get(node[0])
+    return handler(node) if handler else node
+
+
+def _map_to_data(node):
+    result = {}
+    i = 0
+    els = node[1]
+    while i < len(els) - 1:
+        k = _ast_to_data(els[i])
+        v = _ast_to_data(els[i + 1])
+        result[_map_key(k)] = v
+        i += 2
+    return result
+
+
+_TO_DATA = {
+    "INT":     lambda n: n[1],
+    "FLOAT":   lambda n: n[1],
+    "STR":     lambda n: n[1],
+    "BOOL":    lambda n: n[1],
+    "NULL":    lambda n: None,
+    "SYM":     lambda n: ("SYM", n[1]),
+    "KW":      lambda n: kw(n[1]),
+    "HASH":    lambda n: ("HASH", n[1]),
+    "LIST":    lambda n: [_ast_to_data(el) for el in n[1]],
+    "MAP":     _map_to_data,
+    "SEXPR":   lambda n: [_ast_to_data(el) for el in n[1]],
+    "QUOTE":   lambda n: ["quote", _ast_to_data(n[1])],
+    "UNQUOTE": lambda n: ["unquote", _ast_to_data(n[1])],
+    "SPLICE":  lambda n: ["splice", _ast_to_data(n[1])],
+}
 
 
 def _data_to_ast(data):
@@ -997,14 +1474,14 @@ def _data_to_ast(data):
 
 # ─── Public API ────────────────────────────────────────────────────────────
 
+# Prebuilt root frame — default_env hands out shallow copies
+_DEFAULT_ENV = make_env(None, _BUILTINS)
+_DEFAULT_ENV.update({"T": True, "F": False, "N": None})
+
+
 def default_env():
     """Create the default environment with all builtins."""
-    env = make_env()
-    env.update(_BUILTINS)
-    env_set(env, "T", True)
-    env_set(env, "F", False)
-    env_set(env, "N", None)
-    return env
+    return _DEFAULT_ENV.copy()
 
 
 def run_program(ast_nodes, env=None):
@@ -1013,5 +1490,5 @@ def run_program(ast_nodes, env=None):
         env = default_env()
     result = None
     for node in ast_nodes:
-        result = evaluate(node, env)
+        result = compile_node(node)(env)
     return result
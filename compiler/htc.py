@@ -7,39 +7,77 @@ Usage:
     python -m compiler.htc compile <file.ht> <target>  Compile to target (python|js)
     python -m compiler.htc tokenize <file.ht>          Show tokens
     python -m compiler.htc parse <file.ht>             Show AST
-    python -m compiler.htc bench [--verbose] [--category <cat>]  Token compression benchmark
+    python -m compiler.htc bench [--verbose] [--category <cat>] [--cache]  Token compression benchmark
 """
 
-import sys
+import io
 import os
+import re
+import sys
+from bisect import bisect_left
+from functools import lru_cache
 
 # Add parent dir to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from compiler.lexer import tokenize
-from compiler.parser import parse
-from compiler.evaluator import (
-    default_env, run_program, evaluate, _format_val,
-    _SPECIAL_FORMS, _BUILTINS,
-)
+from compiler.lexer import tokenize, tokenize_iter, read_source
+from compiler.parser import parse, flatten
+
+# The evaluator, readline and the disk cache are imported inside the
+# commands that use them, so e.g. `htc tokenize` never loads the evaluator
+
+
+# Front-end results memoized on the source text (REPL re-entries, repeated
+# compiles). Results are shared between callers and must not be mutated.
+
+@lru_cache(maxsize=256)
+def _tokenize_cached(source):
+    return tokenize(source)
+
+
+@lru_cache(maxsize=256)
+def _parse_cached(source):
+    # Parse straight off the token stream; the token list is never built
+    return parse(tokenize_iter(source))
+
+
+@lru_cache(maxsize=256)
+def _parse_file_source(source):
+    # File sources also go through the on-disk cache (see parse_cache)
+    from compiler.parse_cache import get_or_parse
+    return get_or_parse(source)
+
+
+def _parse_file(path):
+    return _parse_file_source(read_source(path))
 
 
 def run_file(path):
     """Read and execute a .ht file."""
-    with open(path, "r") as f:
-        source = f.read()
-    return run_source(source)
+    from compiler.evaluator import default_env, run_program
+    env = default_env()
+    return run_program(_parse_file(path), env), env
 
 
 def run_source(source, env=None):
     """Tokenize, parse, and evaluate a source string."""
-    tokens = tokenize(source)
-    ast = parse(tokens)
+    from compiler.evaluator import default_env, run_program
+    ast = _parse_cached(source)
     if env is None:
         env = default_env()
     return run_program(ast, env), env
 
 
+# REPL commands — one table drives both :help and tab completion
+_REPL_HELP = (
+    (":q", "quit"),
+    (":env", "show user-defined bindings"),
+    (":reset", "reset environment"),
+    ("Tab", "auto-complete symbols"),
+)
+_REPL_COMMANDS = frozenset([name for name, _ in _REPL_HELP if name[0] == ":"] + [":help"])
+
+
 def _setup_readline(env):
     """Configure readline for history and tab completion. Returns history path or None."""
     try:
@@ -47,10 +85,8 @@ def _setup_readline(env):
     except ImportError:
         return None
 
-    # History file
-    history_dir = os.path.expanduser("~/.hivespeak")
-    os.makedirs(history_dir, exist_ok=True)
-    history_path = os.path.join(history_dir, "repl_history")
+    # History file — its directory is created on save, not at startup
+    history_path = os.path.join(os.path.expanduser("~/.hivespeak"), "repl_history")
 
     try:
         readline.read_history_file(history_path)
@@ -59,16 +95,23 @@ def _setup_readline(env):
 
     readline.set_history_length(1000)
 
-    # Tab completion
-    builtins = set(_SPECIAL_FORMS.keys()) | set(_BUILTINS.keys())
-    repl_cmds = {":q", ":env", ":reset", ":help"}
+    # Tab completion — static names sorted once and prefix-searched by bisect;
+    # matches are computed on state 0 and served from cache for later states
+    from compiler.evaluator import _SPECIAL_FORMS, _BUILTINS
+    static = sorted(set(_SPECIAL_FORMS) | set(_BUILTINS) | set(_REPL_COMMANDS))
+    cached = []
 
     def completer(text, state):
-        # Gather completable symbols: builtins + user env bindings + repl commands
-        user_syms = {k for k in env if k != "__parent__"}
-        candidates = builtins | user_syms | repl_cmds
-        matches = [s for s in sorted(candidates) if s.startswith(text)]
-        return matches[state] if state < len(matches) else None
+        if state == 0:
+            i = bisect_left(static, text)
+            found = set()
+            while i < len(static) and static[i].startswith(text):
+                found.add(static[i])
+                i += 1
+            # User env bindings change between completions, so scan them live
+            found.update(k for k in env if k != "__parent__" and k.startswith(text))
+            cached[:] = sorted(found)
+        return cached[state] if state < len(cached) else None
 
     readline.set_completer(completer)
     readline.set_completer_delims(" \t\n()[]{}\"';")
@@ -79,10 +122,14 @@ def _setup_readline(env):
 
 def repl():
     """Interactive Read-Eval-Print Loop."""
+    from compiler.evaluator import default_env, _format_val
     print("HiveSpeak v0.2.0 REPL")
     print("Type expressions, or :q to quit. Tab for completion.\n")
     env = default_env()
-    buf = ""
+    # Pending input lines, plus the bracket depth and string state so far;
+    # each line is scanned once, then the buffer is joined once to evaluate
+    buf = []
+    depth, in_string = 0, False
 
     history_path = _setup_readline(env)
 
@@ -98,10 +145,8 @@ def repl():
             break
 
         if line.strip() == ":help":
-            print("  :q      quit")
-            print("  :env    show user-defined bindings")
-            print("  :reset  reset environment")
-            print("  Tab     auto-complete symbols")
+            for name, desc in _REPL_HELP:
+                print(f"  {name:<8}{desc}")
             continue
 
         if line.strip() == ":env":
@@ -115,25 +160,29 @@ def repl():
             print("Environment reset.")
             continue
 
-        buf += line + "\n"
+        buf.append(line)
 
         # Check if parens are balanced before evaluating
-        if not _balanced(buf):
+        delta, in_string = _bracket_depth(line, in_string)
+        depth += delta
+        if depth > 0:
             continue
 
         try:
-            result, env = run_source(buf.strip(), env)
+            result, env = run_source("\n".join(buf).strip(), env)
             if result is not None:
                 print(_format_val(result))
         except Exception as e:
             print(f"Error: {e}", file=sys.stderr)
 
-        buf = ""
+        buf = []
+        depth, in_string = 0, False
 
     # Save history on exit
     if history_path:
         try:
             import readline
+            os.makedirs(os.path.dirname(history_path), exist_ok=True)
             readline.write_history_file(history_path)
         except Exception:
             pass
@@ -141,10 +190,7 @@ def repl():
 
 def compile_file(path, target):
     """Compile a .ht file to a target language."""
-    with open(path, "r") as f:
-        source = f.read()
-    tokens = tokenize(source)
-    ast = parse(tokens)
+    ast = _parse_file(path)
 
     if target == "python":
         from compiler.targets.to_python import compile_to_python
@@ -159,68 +205,70 @@ def compile_file(path, target):
 
 def show_tokens(path):
     """Print token list for a file."""
-    with open(path, "r") as f:
-        source = f.read()
-    for tok in tokenize(source):
+    source = read_source(path)
+    for tok in _tokenize_cached(source):
         if tok[0] != "EOF":
             print(f"  {tok[0]:8s} {repr(tok[1]):20s} L{tok[2]}:{tok[3]}")
 
 
+_LEAF_TAGS = frozenset(("INT", "FLOAT", "STR", "BOOL", "NULL", "SYM", "KW", "HASH"))
+
+
 def show_ast(path):
     """Print AST for a file."""
-    with open(path, "r") as f:
-        source = f.read()
-    tokens = tokenize(source)
-    ast = parse(tokens)
-    for node in ast:
-        _print_ast(node, 0)
-
-
-def _print_ast(node, depth):
-    """Pretty-print an AST node."""
-    indent = "  " * depth
-    if node[0] in ("INT", "FLOAT", "STR", "BOOL", "NULL", "SYM", "KW", "HASH"):
-        val = node[1] if len(node) > 1 else "nil"
-        print(f"{indent}{node[0]}: {val}")
-    elif node[0] in ("SEXPR", "LIST", "MAP"):
-        print(f"{indent}{node[0]}:")
-        for child in node[1]:
-            _print_ast(child, depth + 1)
-    elif node[0] in ("QUOTE", "UNQUOTE", "SPLICE"):
-        print(f"{indent}{node[0]}:")
-        _print_ast(node[1], depth + 1)
-    else:
-        print(f"{indent}{node}")
+    tags, values, _locs, depths = flatten(_parse_file(path))
+    indents = ["  " * d for d in range(max(depths, default=0) + 1)]
+    # Lines collect in one buffer and go out in a single write
+    out = io.StringIO()
+    write = out.write
+    for i in range(len(tags)):
+        if tags[i] in _LEAF_TAGS:
+            write(f"{indents[depths[i]]}{tags[i]}: {values[i]}\n")
+        else:
+            write(f"{indents[depths[i]]}{tags[i]}:\n")
+    sys.stdout.write(out.getvalue())
+
+
+# A quote toggles string state unless the previous char is a backslash
+_QUOTE_SPLIT = re.compile(r'(?<!\\)"')
+
+
+def _bracket_depth(text, in_string=False):
+    """Net open-bracket count of text outside strings. Returns (delta, in_string).
+
+    in_string is the string state at the start of text, so a buffer can be
+    scanned a line at a time.
+    """
+    if '"' in text:
+        # Keep only the outside-string segments
+        parts = _QUOTE_SPLIT.split(text)
+        text = "".join(parts[1::2] if in_string else parts[::2])
+        in_string ^= bool((len(parts) - 1) & 1)
+    elif in_string:
+        return 0, True
+    delta = (text.count("(") + text.count("[") + text.count("{")
+             - text.count(")") - text.count("]") - text.count("}"))
+    return delta, in_string
 
 
 def _balanced(text):
     """Check if parens/brackets/braces are balanced."""
-    depth = 0
-    in_string = False
-    for i, c in enumerate(text):
-        if c == '"' and (i == 0 or text[i - 1] != "\\"):
-            in_string = not in_string
-        if in_string:
-            continue
-        if c in "([{":
-            depth += 1
-        elif c in ")]}":
-            depth -= 1
-    return depth <= 0
+    return _bracket_depth(text)[0] <= 0
 
 
 def run_bench(args):
     """Run token compression benchmark."""
-    from compiler.bench import run_benchmark, format_report
+    from compiler.bench import run_benchmark, format_report, _COUNT_CACHE_PATH
 
     verbose = "--verbose" in args or "-v" in args
+    cache_path = _COUNT_CACHE_PATH if "--cache" in args else None
     category = None
     if "--category" in args:
         idx = args.index("--category")
         if idx + 1 < len(args):
             category = args[idx + 1]
 
-    results, summary = run_benchmark(category=category)
+    results, summary = run_benchmark(category=category, cache_path=cache_path)
     print(format_report(results, summary, verbose=verbose))
 
 
@@ -1,222 +1,195 @@
-"""HiveSpeak Lexer — tokenizes source into a flat token list.
+"""HiveSpeak Lexer — tokenizes source into a flat token list (or a token stream).
 
 Tokens are tuples: (type, value, line, col)
-Pure functional style — no mutable global state.
+Pure functional style — no mutable global state. Scanning is done by a
+single precompiled regex; line/col are derived from match offsets.
 """
 
-# Token type constants
-T_INT = "INT"
-T_FLOAT = "FLOAT"
-T_STRING = "STRING"
-T_BOOL = "BOOL"
-T_NULL = "NULL"
-T_SYM = "SYM"
-T_KW = "KW"
-T_HASH = "HASH"
-T_LPAREN = "LPAREN"
-T_RPAREN = "RPAREN"
-T_LBRACK = "LBRACK"
-T_RBRACK = "RBRACK"
-T_LBRACE = "LBRACE"
-T_RBRACE = "RBRACE"
-T_QUOTE = "QUOTE"
-T_UNQUOTE = "UNQUOTE"
-T_SPLICE = "SPLICE"
-T_PIPE = "PIPE"
-T_EOF = "EOF"
+import re
+import sys
+
+# Token type constants — interned so type checks can compare by identity
+T_INT = sys.intern("INT")
+T_FLOAT = sys.intern("FLOAT")
+T_STRING = sys.intern("STRING")
+T_BOOL = sys.intern("BOOL")
+T_NULL = sys.intern("NULL")
+T_SYM = sys.intern("SYM")
+T_KW = sys.intern("KW")
+T_HASH = sys.intern("HASH")
+T_LPAREN = sys.intern("LPAREN")
+T_RPAREN = sys.intern("RPAREN")
+T_LBRACK = sys.intern("LBRACK")
+T_RBRACK = sys.intern("RBRACK")
+T_LBRACE = sys.intern("LBRACE")
+T_RBRACE = sys.intern("RBRACE")
+T_QUOTE = sys.intern("QUOTE")
+T_UNQUOTE = sys.intern("UNQUOTE")
+T_SPLICE = sys.intern("SPLICE")
+T_PIPE = sys.intern("PIPE")
+T_EOF = sys.intern("EOF")
 
 DELIMITERS = {"(", ")", "[", "]", "{", "}", " ", "\t", "\n", "\r", ";", '"', "'", ","}
 
 SYMBOL_START = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_!?+-*/<>=&|%~")
 SYMBOL_CONT = SYMBOL_START | set("0123456789.-")
 
-
-def _is_digit(c):
-    return c in "0123456789"
-
-
-def _skip_whitespace_and_comments(src, pos, line, col):
-    """Advance past whitespace and ; comments. Returns (new_pos, new_line, new_col)."""
-    n = len(src)
-    while pos < n:
-        c = src[pos]
-        if c == "\n":
-            pos += 1
-            line += 1
-            col = 1
-        elif c in " \t\r":
-            pos += 1
-            col += 1
-        elif c == ";":
-            while pos < n and src[pos] != "\n":
-                pos += 1
-        else:
-            break
-    return pos, line, col
-
-
-def _read_string(src, pos, line, col):
-    """Read a quoted string starting at pos (which points to opening \"). Returns (token, new_pos, col)."""
-    start_col = col
-    pos += 1  # skip opening "
-    col += 1
-    buf = []
-    n = len(src)
-    while pos < n and src[pos] != '"':
-        if src[pos] == "\\" and pos + 1 < n:
-            esc = src[pos + 1]
-            escape_map = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"'}
-            buf.append(escape_map.get(esc, esc))
-            pos += 2
-            col += 2
+DIGITS = frozenset("0123456789")
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"'}
+
+# Small non-negative integer literals resolve by table instead of int()
+_SMALL_INTS = {str(i): i for i in range(1024)}
+
+_RESERVED = {
+    "T": (T_BOOL, True),
+    "F": (T_BOOL, False),
+    "N": (T_NULL, None),
+}
+
+# Master scanner — one compiled regex. Alternatives are ordered by how often
+# they match in real sources; the only priority constraints are PIPE and
+# numbers before SYM ("|" and "-" also start symbols), all other first chars
+# are disjoint. Runs of symbol/keyword/hash text stop at any DELIMITERS char;
+# sre compiles the negated class to a bitmap, so the delimiter test is a
+# table probe in C.
+_WORD = "[^" + "".join(map(re.escape, sorted(DELIMITERS))) + "]*"
+
+_SCANNER = re.compile(
+    r"(?P<WS>[ \t\r\n]+)"
+    r"|(?P<SINGLE>[()\[\]{}'])"
+    r"|(?P<PIPE>\|>)"
+    r"|(?P<FLOAT>-?[0-9]+\.[0-9]+)"
+    r"|(?P<INT>-?[0-9]+)"
+    r"|(?P<SYM>[" + "".join(map(re.escape, sorted(SYMBOL_START))) + "]" + _WORD + ")"
+    r'|(?P<STRING>"[^"\\]*(?:\\.[^"\\]*)*")'
+    r"|(?P<COMMENT>;[^\n]*)"
+    r"|(?P<KW>:" + _WORD + ")"
+    r"|(?P<HASH>#" + _WORD + ")"
+    r"|(?P<SPLICE>,@)"
+    r"|(?P<UNQUOTE>,)"
+    r"|(?P<ERR>.)",
+    re.DOTALL,
+)
+
+# Single-char tokens map straight to their type
+_SINGLE_TOKENS = {
+    "(": T_LPAREN, ")": T_RPAREN,
+    "[": T_LBRACK, "]": T_RBRACK,
+    "{": T_LBRACE, "}": T_RBRACE,
+    "'": T_QUOTE,
+}
+
+
+def _unescape(body):
+    """Decode backslash escapes in a string body matched by the scanner.
+
+    Splitting on backslashes copies each unescaped run as one slice; every
+    part after the first starts with the escaped char, and an empty part
+    marks an escaped backslash (the scanner guarantees a char after each \\).
+    """
+    parts = body.split("\\")
+    out = [parts[0]]
+    i, n = 1, len(parts)
+    while i < n:
+        part = parts[i]
+        if not part:
+            out.append("\\")
+            out.append(parts[i + 1])
+            i += 2
         else:
-            buf.append(src[pos])
-            pos += 1
-            col += 1
-    if pos >= n:
-        raise SyntaxError(f"Unterminated string at line {line}, col {start_col}")
-    pos += 1  # skip closing "
-    col += 1
-    return (T_STRING, "".join(buf), line, start_col), pos, col
-
-
-def _read_number(src, pos, line, col):
-    """Read an integer or float. Returns (token, new_pos, col)."""
-    start = pos
-    start_col = col
-    n = len(src)
-    if pos < n and src[pos] == "-":
-        pos += 1
-        col += 1
-    while pos < n and _is_digit(src[pos]):
-        pos += 1
-        col += 1
-    if pos < n and src[pos] == "." and pos + 1 < n and _is_digit(src[pos + 1]):
-        pos += 1
-        col += 1
-        while pos < n and _is_digit(src[pos]):
-            pos += 1
-            col += 1
-        return (T_FLOAT, float(src[start:pos]), line, start_col), pos, col
-    return (T_INT, int(src[start:pos]), line, start_col), pos, col
-
-
-def _read_symbol_or_keyword(src, pos, line, col):
-    """Read a symbol, keyword, or reserved literal. Returns (token, new_pos, col)."""
-    start_col = col
-    is_kw = src[pos] == ":"
-    if is_kw:
-        pos += 1
-        col += 1
-    start = pos
-    n = len(src)
-    while pos < n and src[pos] not in DELIMITERS:
-        pos += 1
-        col += 1
-    text = src[start:pos]
-    if is_kw:
-        return (T_KW, text, line, start_col), pos, col
-    if text == "T":
-        return (T_BOOL, True, line, start_col), pos, col
-    if text == "F":
-        return (T_BOOL, False, line, start_col), pos, col
-    if text == "N":
-        return (T_NULL, None, line, start_col), pos, col
-    return (T_SYM, text, line, start_col), pos, col
-
-
-def _read_hash(src, pos, line, col):
-    """Read a #hash reference. Returns (token, new_pos, col)."""
-    start_col = col
-    pos += 1  # skip #
-    col += 1
-    start = pos
-    n = len(src)
-    while pos < n and src[pos] not in DELIMITERS:
-        pos += 1
-        col += 1
-    return (T_HASH, src[start:pos], line, start_col), pos, col
+            esc = part[0]
+            out.append(_ESCAPES.get(esc, esc))
+            out.append(part[1:])
+            i += 1
+    return "".join(out)
 
 
-def tokenize(source):
-    """Tokenize HiveSpeak source string into a list of tokens.
+def tokenize_iter(source):
+    """Lazily tokenize HiveSpeak source, yielding (type, value, line, col).
 
-    Each token is (type, value, line, col).
+    The final token is always EOF.
     """
-    tokens = []
-    pos = 0
+    intern = sys.intern
     line = 1
-    col = 1
-    n = len(source)
-
-    while pos < n:
-        pos, line, col = _skip_whitespace_and_comments(source, pos, line, col)
-        if pos >= n:
-            break
-
-        c = source[pos]
-
-        # Single-char delimiters
-        if c == "(":
-            tokens.append((T_LPAREN, "(", line, col))
-            pos += 1
-            col += 1
-        elif c == ")":
-            tokens.append((T_RPAREN, ")", line, col))
-            pos += 1
-            col += 1
-        elif c == "[":
-            tokens.append((T_LBRACK, "[", line, col))
-            pos += 1
-            col += 1
-        elif c == "]":
-            tokens.append((T_RBRACK, "]", line, col))
-            pos += 1
-            col += 1
-        elif c == "{":
-            tokens.append((T_LBRACE, "{", line, col))
-            pos += 1
-            col += 1
-        elif c == "}":
-            tokens.append((T_RBRACE, "}", line, col))
-            pos += 1
-            col += 1
-        elif c == "'":
-            tokens.append((T_QUOTE, "'", line, col))
-            pos += 1
-            col += 1
-        elif c == ",":
-            if pos + 1 < n and source[pos + 1] == "@":
-                tokens.append((T_SPLICE, ",@", line, col))
-                pos += 2
-                col += 2
+    line_start = 0   # source index of column 1 on the current line
+    end_col = None   # EOF column when the source ends in a comment
+
+    for m in _SCANNER.finditer(source):
+        kind = m.lastgroup
+        start = m.start()
+        if kind == "WS":
+            text = m.group()
+            nl = text.count("\n")
+            if nl:
+                line += nl
+                line_start = start + text.rindex("\n") + 1
+                end_col = None
+            continue
+        col = start - line_start + 1
+        if kind == "SINGLE":
+            c = m.group()
+            yield (_SINGLE_TOKENS[c], c, line, col)
+        elif kind == "SYM":
+            text = intern(m.group())
+            reserved = _RESERVED.get(text)
+            if reserved is not None:
+                yield (reserved[0], reserved[1], line, col)
             else:
-                tokens.append((T_UNQUOTE, ",", line, col))
-                pos += 1
-                col += 1
-        # Pipe operator |>
-        elif c == "|" and pos + 1 < n and source[pos + 1] == ">":
-            tokens.append((T_PIPE, "|>", line, col))
-            pos += 2
-            col += 2
-        # String
-        elif c == '"':
-            tok, pos, col = _read_string(source, pos, line, col)
-            tokens.append(tok)
-        # Hash reference
-        elif c == "#":
-            tok, pos, col = _read_hash(source, pos, line, col)
-            tokens.append(tok)
-        # Number (or negative number)
-        elif _is_digit(c) or (c == "-" and pos + 1 < n and _is_digit(source[pos + 1])):
-            tok, pos, col = _read_number(source, pos, line, col)
-            tokens.append(tok)
-        # Keyword or symbol
-        elif c == ":" or c in SYMBOL_START:
-            tok, pos, col = _read_symbol_or_keyword(source, pos, line, col)
-            tokens.append(tok)
+                # Interned so repeated names share one string and env
+                # lookups hit the dict identity fast path
+                yield (T_SYM, text, line, col)
+        elif kind == "INT":
+            text = m.group()
+            value = _SMALL_INTS.get(text)
+            yield (T_INT, int(text) if value is None else value, line, col)
+        elif kind == "FLOAT":
+            yield (T_FLOAT, float(m.group()), line, col)
+        elif kind == "KW":
+            yield (T_KW, intern(m.group()[1:]), line, col)
+        elif kind == "STRING":
+            body = m.group()[1:-1]
+            if "\\" in body:
+                body = _unescape(body)
+            yield (T_STRING, body, line, col)
+        elif kind == "COMMENT":
+            end_col = col
+            continue
+        elif kind == "HASH":
+            yield (T_HASH, m.group()[1:], line, col)
+        elif kind == "PIPE":
+            yield (T_PIPE, "|>", line, col)
+        elif kind == "UNQUOTE":
+            yield (T_UNQUOTE, ",", line, col)
+        elif kind == "SPLICE":
+            yield (T_SPLICE, ",@", line, col)
         else:
+            c = m.group()
+            if c == '"':
+                raise SyntaxError(f"Unterminated string at line {line}, col {col}")
             raise SyntaxError(f"Unexpected character '{c}' at line {line}, col {col}")
+        end_col = None
+
+    if end_col is None:
+        end_col = len(source) - line_start + 1
+    yield (T_EOF, None, line, end_col)
 
-    tokens.append((T_EOF, None, line, col))
-    return tokens
+
+def tokenize(source):
+    """Tokenize HiveSpeak source string into a list of tokens.
+
+    Each token is (type, value, line, col).
+    """
+    return list(tokenize_iter(source))
+
+
+def read_source(path):
+    """Read a source file: one binary read and one UTF-8 decode.
+
+    Newlines are translated as text-mode open() would (\r\n and \r -> \n).
+    """
+    with open(path, "rb") as f:
+        source = f.read().decode("utf-8")
+    if "\r" in source:
+        source = source.replace("\r\n", "\n").replace("\r", "\n")
+    return source
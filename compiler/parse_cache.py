@@ -0,0 +1,76 @@
+"""HiveSpeak parse cache — ASTs persisted on disk across invocations.
+
+Entries live in ~/.hivespeak/cache/<blake2b(source)>.pkl: a format header
+followed by the pickled AST. Hits skip lexing and parsing entirely; the
+cache is best-effort, so any read or write failure falls back to a normal
+parse. Set HIVESPEAK_NO_CACHE=1 to disable.
+"""
+
+import hashlib
+import os
+import pickle
+
+from .lexer import tokenize_iter
+from .parser import parse
+
+CACHE_DIR = os.path.join(os.path.expanduser("~/.hivespeak"), "cache")
+MAX_ENTRIES = 500
+
+# Bumped whenever the AST shape changes, so stale entries never match.
+# Also written at the head of every entry; files without it are never loaded
+_FORMAT = b"hive-ast-1\0"
+
+
+def cache_key(source):
+    """Hex blake2b-128 digest identifying a source text."""
+    return hashlib.blake2b(_FORMAT + source.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_or_parse(source, cache_dir=None):
+    """Return the AST for source, loading it from the disk cache when present."""
+    if os.environ.get("HIVESPEAK_NO_CACHE"):
+        return parse(tokenize_iter(source))
+    cache_dir = cache_dir or CACHE_DIR
+    path = os.path.join(cache_dir, cache_key(source) + ".pkl")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data.startswith(_FORMAT):
+            ast = pickle.loads(data[len(_FORMAT):])
+            os.utime(path)  # mtime doubles as the LRU timestamp
+            return ast
+    except Exception:
+        pass
+    ast = parse(tokenize_iter(source))
+    _store(path, ast, cache_dir)
+    return ast
+
+
+def _store(path, ast, cache_dir):
+    """Write an entry atomically, then trim the cache. Failures are ignored."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(_FORMAT)
+            pickle.dump(ast, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        _evict(cache_dir)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _evict(cache_dir, max_entries=MAX_ENTRIES):
+    """Drop least-recently-used entries beyond max_entries."""
+    entries = [e for e in os.scandir(cache_dir) if e.name.endswith(".pkl")]
+    if len(entries) <= max_entries:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for e in entries[:len(entries) - max_entries]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
@@ -1,7 +1,8 @@
 """HiveSpeak Parser — transforms token list into AST.
 
 AST nodes are tagged tuples: ("TYPE", ...fields)
-Pure functional — parse(tokens) -> ast_nodes list.
+Pure functional — parse(tokens) -> ast_nodes list. Tokens are consumed
+strictly left to right, so a lazy token stream works as well as a list.
 """
 
 from .lexer import (
@@ -33,95 +34,128 @@ def node_loc(n):
     return None
 
 
-def _tok_type(tokens, pos):
-    return tokens[pos][0]
-
-
-def _tok_val(tokens, pos):
-    return tokens[pos][1]
-
-
-def _tok_loc(tokens, pos):
-    return tokens[pos][2], tokens[pos][3]
-
-
-def _err(msg, tokens, pos):
-    line, col = _tok_loc(tokens, pos)
-    return SyntaxError(f"{msg} at line {line}, col {col}")
-
-
-# Atom parsers — one dict lookup to map token type → AST constructor
-_ATOM_MAP = {
-    T_INT:    n_int,
-    T_FLOAT:  n_float,
-    T_STRING: n_str,
-    T_BOOL:   n_bool,
-    T_NULL:   lambda v, loc=None: n_null(loc),
-    T_SYM:    n_sym,
-    T_KW:     n_kw,
-    T_HASH:   n_hash,
+def _err(msg, tok):
+    return SyntaxError(f"{msg} at line {tok[2]}, col {tok[3]}")
+
+
+# Token dispatch — one table probe per token gives (kind, arg); kinds are
+# tested in order of frequency in real sources (atoms, closes, opens)
+_ATOM, _CLOSE, _OPEN, _PREFIX = range(4)
+
+_DISPATCH = {
+    # Atom tokens map 1:1 onto AST nodes: arg is the AST tag
+    T_SYM:     (_ATOM, "SYM"),
+    T_INT:     (_ATOM, "INT"),
+    T_STRING:  (_ATOM, "STR"),
+    T_KW:      (_ATOM, "KW"),
+    T_FLOAT:   (_ATOM, "FLOAT"),
+    T_BOOL:    (_ATOM, "BOOL"),
+    T_NULL:    (_ATOM, "NULL"),
+    T_HASH:    (_ATOM, "HASH"),
+    T_PIPE:    (_ATOM, "SYM"),     # |> is a symbol in expression position
+    T_RPAREN:  (_CLOSE, None),
+    T_RBRACK:  (_CLOSE, None),
+    T_RBRACE:  (_CLOSE, None),
+    # Open delimiters: arg is (AST tag, close token)
+    T_LPAREN:  (_OPEN, ("SEXPR", T_RPAREN)),
+    T_LBRACK:  (_OPEN, ("LIST", T_RBRACK)),
+    T_LBRACE:  (_OPEN, ("MAP", T_RBRACE)),
+    # Prefix forms wrap the next complete expression: arg is the AST tag
+    T_QUOTE:   (_PREFIX, "QUOTE"),
+    T_UNQUOTE: (_PREFIX, "UNQUOTE"),
+    T_SPLICE:  (_PREFIX, "SPLICE"),
 }
 
-
-def _parse_expr(tokens, pos):
-    """Parse one expression. Returns (ast_node, new_pos)."""
-    tt = _tok_type(tokens, pos)
-    loc = _tok_loc(tokens, pos)
-
-    # Atoms — direct lookup
-    if tt in _ATOM_MAP:
-        return _ATOM_MAP[tt](_tok_val(tokens, pos), loc), pos + 1
-
-    # S-expression: (...)
-    if tt == T_LPAREN:
-        return _parse_delimited(tokens, pos + 1, T_RPAREN, n_sexpr, loc)
-
-    # List literal: [...]
-    if tt == T_LBRACK:
-        return _parse_delimited(tokens, pos + 1, T_RBRACK, n_list, loc)
-
-    # Map literal: {...}
-    if tt == T_LBRACE:
-        return _parse_delimited(tokens, pos + 1, T_RBRACE, n_map, loc)
-
-    # Quote: 'expr
-    if tt == T_QUOTE:
-        inner, pos = _parse_expr(tokens, pos + 1)
-        return n_quote(inner, loc), pos
-
-    # Unquote: ~expr
-    if tt == T_UNQUOTE:
-        inner, pos = _parse_expr(tokens, pos + 1)
-        return n_unquote(inner, loc), pos
-
-    # Splice: ~@expr
-    if tt == T_SPLICE:
-        inner, pos = _parse_expr(tokens, pos + 1)
-        return n_splice(inner, loc), pos
-
-    # Pipe operator |> (treat as symbol in expression position)
-    if tt == T_PIPE:
-        return n_sym("|>", loc), pos + 1
-
-    raise _err(f"Unexpected token {tt}({_tok_val(tokens, pos)})", tokens, pos)
-
-
-def _parse_delimited(tokens, pos, end_token, wrapper_fn, loc=None):
-    """Parse expressions until end_token. Returns (wrapped_node, new_pos)."""
-    elements = []
-    while _tok_type(tokens, pos) != end_token:
-        if _tok_type(tokens, pos) == T_EOF:
-            raise _err(f"Expected {end_token}, got EOF", tokens, pos)
-        node, pos = _parse_expr(tokens, pos)
-        elements.append(node)
-    return wrapper_fn(elements, loc), pos + 1  # skip closing delimiter
+_CONTAINER_TAGS = frozenset(arg[0] for kind, arg in _DISPATCH.values() if kind == _OPEN)
+_WRAPPER_TAGS = frozenset(arg for kind, arg in _DISPATCH.values() if kind == _PREFIX)
+
+
+def _parse_expr(tok, next_tok):
+    """Parse one expression starting at tok, pulling more tokens via next_tok.
+
+    Reads exactly the tokens of the expression — nothing past its end — so
+    the token source can be a lazy stream. Nesting is tracked on an explicit
+    stack of frames instead of Python recursion. A frame is
+    (tag, elements, close_token, loc) for an open delimiter, or
+    (tag, None, None, loc) for a pending quote/unquote/splice.
+    """
+    stack = []
+    while True:
+        tt = tok[0]
+        entry = _DISPATCH.get(tt)
+        if entry is None:
+            # EOF (or an unknown token type)
+            if tt == T_EOF and stack and stack[-1][1] is not None:
+                raise _err(f"Expected {stack[-1][2]}, got EOF", tok)
+            raise _err(f"Unexpected token {tt}({tok[1]})", tok)
+        kind, arg = entry
+
+        if kind == _ATOM:
+            node = (arg, tok[1], (tok[2], tok[3]))
+        elif kind == _CLOSE:
+            # Must close the innermost open delimiter
+            if not stack or stack[-1][2] != tt:
+                raise _err(f"Unexpected token {tt}({tok[1]})", tok)
+            top = stack.pop()
+            node = (top[0], top[1], top[3])
+        elif kind == _OPEN:
+            stack.append((arg[0], [], arg[1], (tok[2], tok[3])))
+            tok = next_tok()
+            continue
+        else:
+            stack.append((arg, None, None, (tok[2], tok[3])))
+            tok = next_tok()
+            continue
+
+        # Hand the finished node to its enclosing frame
+        while stack:
+            top = stack[-1]
+            if top[1] is not None:
+                top[1].append(node)
+                break
+            stack.pop()
+            node = (top[0], node, top[3])
+        else:
+            return node
+        tok = next_tok()
 
 
 def parse(tokens):
-    """Parse a token list into a list of AST nodes (top-level expressions)."""
+    """Parse tokens into a list of AST nodes (top-level expressions).
+
+    tokens may be a list or any iterable ending in EOF, e.g. tokenize_iter().
+    """
+    next_tok = iter(tokens).__next__
     nodes = []
-    pos = 0
-    while _tok_type(tokens, pos) != T_EOF:
-        node, pos = _parse_expr(tokens, pos)
-        nodes.append(node)
+    tok = next_tok()
+    while tok[0] != T_EOF:
+        nodes.append(_parse_expr(tok, next_tok))
+        tok = next_tok()
     return nodes
+
+
+def flatten(nodes):
+    """Flatten an AST into parallel preorder arrays (tags, values, locs, depths).
+
+    Index i describes the i-th node in preorder: its tag, its atom value
+    (None for SEXPR/LIST/MAP and quote forms), its location, and its nesting
+    depth. A node's children are the following nodes until depth returns to
+    its own.
+    """
+    tags, values, locs, depths = [], [], [], []
+    stack = [(n, 0) for n in reversed(nodes)]
+    while stack:
+        node, depth = stack.pop()
+        tag = node[0]
+        tags.append(tag)
+        locs.append(node[2] if len(node) > 2 else None)
+        depths.append(depth)
+        if tag in _CONTAINER_TAGS:
+            values.append(None)
+            stack.extend([(child, depth + 1) for child in reversed(node[1])])
+        elif tag in _WRAPPER_TAGS:
+            values.append(None)
+            stack.append((node[1], depth + 1))
+        else:
+            values.append(node[1] if len(node) > 1 else None)
+    return tags, values, locs, depths
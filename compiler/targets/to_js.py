@@ -67,6 +67,7 @@ def compile_to_js(ast_nodes):
         "const tl = a => a.slice(1);",
         "const nth = (a, i) => a[i];",
         "const push = (a, v) => [...a, v];",
+        "const push_b = (a, v) => (a.push(v), a);",
         "const map = (f, a) => a.map(f);",
         "const flt = (f, a) => a.filter(f);",
         "const red = (f, init, a) => a.reduce(f, init);",
@@ -79,7 +80,7 @@ def compile_to_js(ast_nodes):
         "const spl = (a,s) => a.split(s);",
         "const upr = a => a.toUpperCase();",
         "const lwr = a => a.toLowerCase();",
-        "const fmt = (t,...a) => a.reduce((s,v) => s.replace('{}',String(v)), t);",
+        "const fmt = (t,...a) => { const p = t.split('{}'); if (p.length > a.length + 1) p.splice(a.length, Infinity, p.slice(a.length).join('{}')); return p.reduce((s,q,i) => s + String(a[i-1]) + q); };",
         "const get = (m,k) => m[k];",
         "const put = (m,k,v) => ({...m, [k]: v});",
         "const del = (m,k) => { const r={...m}; delete r[k]; return r; };",
@@ -87,6 +88,9 @@ def compile_to_js(ast_nodes):
         "const vals = m => Object.values(m);",
         "const has = (m,k) => k in m;",
         "const mrg = (a,b) => ({...a,...b});",
+        "const put_b = (m,k,v) => (m[k] = v, m);",
+        "const del_b = (m,k) => (delete m[k], m);",
+        "const mrg_b = (a,b) => Object.assign(a, b);",
         "",
         "// Operator functions (for passing as values)",
         "const ht_add = (...a) => a.reduce((x,y) => x+y);",
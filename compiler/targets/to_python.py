@@ -29,14 +29,17 @@ _PREAMBLE = """\
 # Generated by HiveSpeak compiler v0.2.0
 # Target: Python
 
-import hashlib, json, time, sys, functools
+import collections, hashlib, time, sys, functools
 
 # ─── HiveSpeak runtime ────────────────────────────────────────────────────
 
 _packets = {}
 
+def _ht_hash_id(v):
+    return hashlib.blake2b(str(v).encode(), digest_size=6).hexdigest()
+
 def _ht_cell(state):
-    cid = hashlib.sha256(json.dumps(str(state)).encode()).hexdigest()[:12]
+    cid = _ht_hash_id(state)
     return {'__type__': 'cell', 'id': cid, 'state': dict(state), 'inbox': []}
 
 def _ht_emit(cell, target, content):
@@ -60,18 +63,16 @@ def _ht_compress(coll):
     compressed = {}
     for k, values in shared.items():
         if values:
-            counts = {}
-            for v in values:
-                counts[str(v)] = counts.get(str(v), 0) + 1
-            winner = max(counts, key=counts.get)
-            compressed[k] = next(v for v in values if str(v) == winner)
-    h = hashlib.sha256(json.dumps(str(compressed)).encode()).hexdigest()[:12]
+            keys = list(map(str, values))
+            winner = collections.Counter(keys).most_common(1)[0][0]
+            compressed[k] = values[keys.index(winner)]
+    h = _ht_hash_id(compressed)
     pkt = {'__type__': 'packet', 'hash': h, 'data': compressed}
     _packets[h] = pkt
     return {'ok': pkt}
 
 def _ht_packet(data):
-    h = hashlib.sha256(json.dumps(str(data)).encode()).hexdigest()[:12]
+    h = _ht_hash_id(data)
     pkt = {'__type__': 'packet', 'hash': h, 'data': data}
     _packets[h] = pkt
     return pkt
@@ -107,6 +108,7 @@ hd = lambda a: a[0] if a else None
 tl = lambda a: a[1:] if a else []
 nth = lambda a, i: a[i] if 0 <= i < len(a) else None
 push = lambda a, v: a + [v]
+push_b = lambda a, v: (a.append(v), a)[-1]
 srt = lambda a, key=None: sorted(a, key=key) if key else sorted(a)
 rev = lambda a: list(reversed(a))
 flat = lambda a: [x for sub in a for x in (sub if isinstance(sub, list) else [sub])]
@@ -117,7 +119,9 @@ idx = lambda a, b: a.index(b) if b in a else -1
 spl = lambda a, s: a.split(s)
 upr = lambda a: a.upper()
 lwr = lambda a: a.lower()
-fmt = lambda t, *a: functools.reduce(lambda s, v: s.replace('{}', _ht_format_val(v), 1), a, t)
+def fmt(t, *a):
+    parts = t.split('{}', len(a))
+    return parts[0] + ''.join(_ht_format_val(v) + p for v, p in zip(a, parts[1:]))
 get = lambda m, k: m.get(k)
 put = lambda m, k, v: {**m, k: v}
 ht_del = lambda m, k: {a: b for a, b in m.items() if a != k}
@@ -125,6 +129,9 @@ keys = lambda m: [(':' + k if isinstance(k, str) else k) for k in m.keys() if k
 vals = lambda m: list(v for k, v in m.items() if k != '__type__')
 has = lambda m, k: k in m
 mrg = lambda a, b: {**a, **b}
+put_b = lambda m, k, v: (m.__setitem__(k, v), m)[-1]
+del_b = lambda m, k: (m.pop(k, None), m)[-1]
+mrg_b = lambda a, b: (a.update(b), a)[-1]
 ht_map = lambda f, lst: list(map(f, lst))
 flt = lambda f, lst: list(filter(f, lst))
 red = lambda f, init, lst: functools.reduce(f, lst, init)
@@ -134,7 +141,7 @@ ht_range = lambda *a: list(range(*a))
 ht_zip = lambda *lists: [list(x) for x in zip(*lists)]
 ht_len = len
 ht_type = lambda v: type(v).__name__
-ht_hash = lambda v: hashlib.sha256(str(v).encode()).hexdigest()[:12]
+ht_hash = _ht_hash_id
 ht_str = lambda v: _ht_format_val(v)
 ht_int = int
 ht_float = float
@@ -0,0 +1,54 @@
+"""Shared pytest setup for the HiveSpeak test suite."""
+
+import contextlib
+import io
+import sys
+import traceback
+from functools import lru_cache
+
+import pytest
+
+# Import the compiler modules once, before collection, so every test module
+# (and each xdist worker) starts with them already warm in sys.modules
+from compiler import lexer, parser, evaluator, htc, parse_cache  # noqa: F401
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: spawns real processes (deselect with -m 'not slow')")
+
+
+@pytest.fixture(autouse=True)
+def _hermetic_parse_cache(tmp_path, monkeypatch):
+    """Keep htc's disk parse cache out of the real ~/.hivespeak."""
+    monkeypatch.setattr(parse_cache, "CACHE_DIR", str(tmp_path / "parse-cache"))
+
+
+@lru_cache(maxsize=None)
+def run_htc(*args):
+    """Run an htc command in-process and return (stdout, stderr, returncode).
+
+    Commands are deterministic, so each distinct argument list runs once
+    per session and later callers reuse its captured result. Exit codes
+    follow sys.exit: None is 0, an int is itself, anything else is printed
+    to stderr and gives 1.
+    """
+    out, err = io.StringIO(), io.StringIO()
+    saved_argv = sys.argv
+    sys.argv = ["htc", *args]
+    rc = 0
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                htc.main()
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    rc = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    rc = 1
+            except Exception:
+                traceback.print_exc()
+                rc = 1
+    finally:
+        sys.argv = saved_argv
+    return out.getvalue(), err.getvalue(), rc
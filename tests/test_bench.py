@@ -0,0 +1,59 @@
+"""Tests for the benchmark runner and its token-count cache."""
+
+import json
+import types
+
+from compiler import bench
+from compiler.bench import _read_count_cache, _write_count_cache
+
+
+COUNTS = {b"a" * 16: 7, b"b" * 16: 12}
+
+
+def test_count_cache_round_trip(tmp_path):
+    path = str(tmp_path / "sub" / "counts.sqlite")
+    assert _read_count_cache(path) == {}
+    _write_count_cache(path, COUNTS)
+    assert _read_count_cache(path) == COUNTS
+    _write_count_cache(path, {b"a" * 16: 8})
+    assert _read_count_cache(path) == {b"a" * 16: 8, b"b" * 16: 12}
+
+
+def test_count_cache_unusable_file(tmp_path):
+    empty = tmp_path / "empty.sqlite"
+    empty.write_bytes(b"")
+    assert _read_count_cache(str(empty)) == {}
+    junk = tmp_path / "junk.sqlite"
+    junk.write_bytes(b"not a database" * 100)
+    assert _read_count_cache(str(junk)) == {}
+    # Writing replaces the junk with a real cache
+    _write_count_cache(str(junk), COUNTS)
+    assert _read_count_cache(str(junk)) == COUNTS
+
+
+class _WordEncoder:
+    """Stand-in for a tiktoken encoding: one token per whitespace word."""
+    name = "words"
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+
+def test_streamed_pairs_match_loaded(monkeypatch):
+    monkeypatch.setattr(bench, "_get_encoder", lambda: _WordEncoder())
+    monkeypatch.setattr(bench, "ijson", None)
+    loaded = bench.run_benchmark()
+
+    # Fake ijson: items() yields the top-level array elements from the file
+    prefixes = []
+    def items(f, prefix):
+        prefixes.append(prefix)
+        yield from json.load(f)
+    monkeypatch.setattr(bench, "ijson", types.SimpleNamespace(items=items))
+    monkeypatch.setattr(bench, "_STREAM_THRESHOLD", 0)
+    monkeypatch.setattr(bench, "_BATCH_SIZE", 7)  # several partial batches
+    streamed = bench.run_benchmark()
+
+    assert prefixes == ["item"]
+    assert streamed == loaded
+    assert streamed[1]["pair_count"] > 7
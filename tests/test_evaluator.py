@@ -1,17 +1,28 @@
 """Tests for the HiveSpeak evaluator."""
 
+import contextlib
+import io
+import re
+from functools import lru_cache
+
 import pytest
 from compiler.lexer import tokenize
 from compiler.parser import parse
 from compiler.evaluator import (
     evaluate, default_env, run_program, make_env, env_get, env_set, _format_val,
+    compile_node,
 )
 
 
+@lru_cache(maxsize=4096)
+def _parse_cached(src):
+    """Parse each distinct snippet once per session (ASTs are never mutated)."""
+    return parse(tokenize(src))
+
+
 def ev(src, env=None):
     """Evaluate source and return the result."""
-    tokens = tokenize(src)
-    ast = parse(tokens)
+    ast = _parse_cached(src)
     if env is None:
         env = default_env()
     return run_program(ast, env)
@@ -19,95 +30,84 @@ def ev(src, env=None):
 
 def ev_env(src):
     """Evaluate source and return (result, env)."""
-    tokens = tokenize(src)
-    ast = parse(tokens)
+    ast = _parse_cached(src)
     env = default_env()
     result = run_program(ast, env)
     return result, env
 
 
-def ev_output(src, capsys):
-    """Evaluate source and return captured stdout."""
-    ev(src)
-    return capsys.readouterr().out
+def ev_output(src):
+    """Evaluate source and return what it printed (sys.stdout swapped for a buffer)."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        ev(src)
+    return buf.getvalue()
 
 
 # ─── Literals ─────────────────────────────────────────────────────────────
 
-def test_int():
-    assert ev("42") == 42
-
-def test_float():
-    assert ev("3.14") == 3.14
+@pytest.mark.parametrize("src, expected", [
+    ("42", 42),
+    ("3.14", 3.14),
+    ('"hello"', "hello"),
+])
+def test_literal(src, expected):
+    assert ev(src) == expected
 
-def test_string():
-    assert ev('"hello"') == "hello"
-
-def test_bool():
-    assert ev("T") is True
-    assert ev("F") is False
-
-def test_null():
-    assert ev("N") is None
+@pytest.mark.parametrize("src, expected", [("T", True), ("F", False), ("N", None)])
+def test_constant(src, expected):
+    assert ev(src) is expected
 
 
 # ─── Arithmetic ──────────────────────────────────────────────────────────
 
-def test_add():
-    assert ev("(add 2 3)") == 5
-
-def test_add_variadic():
-    assert ev("(add 1 2 3 4 5)") == 15
-
-def test_sub():
-    assert ev("(sub 10 3)") == 7
-
-def test_mul():
-    assert ev("(* 4 5)") == 20
-
-def test_div():
-    assert ev("(/ 10 2)") == 5.0
-
-def test_mod():
-    assert ev("(% 10 3)") == 1
+@pytest.mark.parametrize("src, expected", [
+    ("(add 2 3)", 5),
+    ("(add 1 2 3 4 5)", 15),
+    ("(sub 10 3)", 7),
+    ("(* 4 5)", 20),
+    ("(* 1 2 3 4.0)", 24.0),
+    ('(add "a" "b" "c")', "abc"),
+    ("(/ 10 2)", 5.0),
+    ("(% 10 3)", 1),
+])
+def test_arithmetic(src, expected):
+    assert ev(src) == expected
+
+def test_add_floats_fold_left():
+    # Same result as the transpilers' left fold, whatever sum() does
+    assert ev("(add 0.1 0.2 0.3)") == (0.1 + 0.2) + 0.3
+    assert ev("(add 1 0.1 0.2 0.3)") == ((1 + 0.1) + 0.2) + 0.3
 
 
 # ─── Comparison ──────────────────────────────────────────────────────────
 
-def test_eq():
-    assert ev("(= 1 1)") is True
-    assert ev("(= 1 2)") is False
-
-def test_neq():
-    assert ev("(!= 1 2)") is True
-
-def test_lt():
-    assert ev("(< 1 2)") is True
-
-def test_gt():
-    assert ev("(gt 5 3)") is True
-
-def test_lte():
-    assert ev("(<= 3 3)") is True
-
-def test_gte():
-    assert ev("(>= 4 3)") is True
+@pytest.mark.parametrize("src, expected", [
+    ("(= 1 1)", True),
+    ("(= 1 2)", False),
+    ("(!= 1 2)", True),
+    ("(< 1 2)", True),
+    ("(gt 5 3)", True),
+    ("(<= 3 3)", True),
+    ("(>= 4 3)", True),
+])
+def test_comparison(src, expected):
+    assert ev(src) is expected
 
 
 # ─── Logic ───────────────────────────────────────────────────────────────
 
-def test_and():
-    assert ev("(and T T)") is True
-    assert ev("(and T F)") is False
-
-def test_or():
-    assert ev("(or F T)") is True
-    assert ev("(or F F)") is False
-
-def test_not():
-    assert ev("(not T)") is False
-    assert ev("(not F)") is True
-    assert ev("(not N)") is True
+@pytest.mark.parametrize("src, expected", [
+    ("(and T T)", True),
+    ("(and T F)", False),
+    ("(or F T)", True),
+    ("(or F F)", False),
+    ("(not T)", False),
+    ("(not F)", True),
+    ("(not N)", True),
+])
+def test_logic(src, expected):
+    assert ev(src) is expected
 
 
 # ─── Def ─────────────────────────────────────────────────────────────────
@@ -146,6 +146,9 @@ def test_fn_closure():
 def test_fn_rest_params():
     assert ev("(def f (fn [& args] args)) (f 1 2 3)") == [1, 2, 3]
 
+def test_fn_missing_args_bind_null():
+    assert ev("((fn [a b & r] [a b r]) 1)") == [1, None, []]
+
 
 # ─── If ──────────────────────────────────────────────────────────────────
 
@@ -182,6 +185,14 @@ def test_match_wildcard():
 def test_match_no_match():
     assert ev("(match 99 1 10 2 20)") is None
 
+def test_match_literal_table():
+    assert ev("(match :b :a 1 :b 2 _ 3)") == 2
+    assert ev("(match [1] :a 1 _ 3)") == 3
+    assert ev("(match 1 1 :first 1 :second)") == ("KW", "first")
+
+def test_match_dynamic_pattern():
+    assert ev("(def k 5) (match 5 1 :one k :k _ :other)") == ("KW", "k")
+
 
 # ─── Loop/Recur ──────────────────────────────────────────────────────────
 
@@ -203,6 +214,20 @@ def test_factorial():
         (factorial 10)
     """) == 3628800
 
+def test_loop_recur_through_let_do():
+    assert ev("""
+        (loop [i 0 acc []]
+          (let [j (add i 1)]
+            (do (if (gt j 3) acc (recur j (push acc j))))))
+    """) == [1, 2, 3]
+
+def test_loop_recur_through_match():
+    assert ev("(loop [x 0] (match x 3 :three _ (recur (add x 1))))") == ("KW", "three")
+
+def test_loop_recur_non_tail():
+    # recur inside try is not a compiled tail position
+    assert ev("(loop [x 0] (try (if (= x 3) x (recur (add x 1)))))") == 3
+
 
 # ─── Quote/Eval ──────────────────────────────────────────────────────────
 
@@ -232,6 +257,9 @@ def test_try_catch():
 def test_pipe_simple():
     assert ev("(|> 5 (add 3))") == 8
 
+def test_pipe_bare_step():
+    assert ev("(def (inc x) (add x 1)) (|> 5 inc (* 2) str)") == "12"
+
 def test_pipe_chain():
     result = ev("""
         (|> [1 2 3 4 5 6 7 8 9 10]
@@ -262,6 +290,9 @@ def test_spl():
 def test_fmt():
     assert ev('(fmt "x={}" 42)') == "x=42"
 
+def test_fmt_multiple():
+    assert ev('(fmt "{}-{} {}" 1 [2 {:a 3}])') == "1-[2 {:a 3}] {}"
+
 
 # ─── List Ops ────────────────────────────────────────────────────────────
 
@@ -277,6 +308,12 @@ def test_nth():
 def test_push():
     assert ev("(push [1 2] 3)") == [1, 2, 3]
 
+def test_push_in_place():
+    assert ev("(def xs [1 2]) (push! xs 3) xs") == [1, 2, 3]
+
+def test_flat_mixed():
+    assert ev("(flat [[1 2] 3 [4]])") == [1, 2, 3, 4]
+
 def test_rev():
     assert ev("(rev [1 2 3])") == [3, 2, 1]
 
@@ -289,6 +326,12 @@ def test_flt():
 def test_red():
     assert ev("(red add 0 [1 2 3 4 5])") == 15
 
+def test_red_user_fn():
+    assert ev("(red (fn [acc x] (add acc x)) 0 [1 2 3 4 5])") == 15
+
+def test_map_fresh_scope_per_element():
+    assert ev("(map (fn [f] (f)) (map (fn [x] (fn [] x)) [1 2 3]))") == [1, 2, 3]
+
 def test_srt():
     assert ev("(srt [3 1 2])") == [1, 2, 3]
 
@@ -343,6 +386,15 @@ def test_mrg():
     result = ev("(mrg {:a 1} {:b 2})")
     assert result == {"a": 1, "b": 2}
 
+def test_map_in_place_variants():
+    result, env = ev_env("(def m {:a 1}) (put! m :b 2) (mrg! m {:c 3}) (del! m :a)")
+    assert result is env["m"]
+    assert result == {"b": 2, "c": 3}
+
+def test_keyword_values_shared():
+    a, b = ev("[(hd (keys {:a 1})) :a]")
+    assert a == ("KW", "a") and a is b
+
 
 # ─── Type Checks ─────────────────────────────────────────────────────────
 
@@ -423,11 +475,34 @@ def test_compress():
     assert "ok" in result
     assert result["ok"]["__type__"] == "packet"
 
+def test_compress_consensus():
+    result = ev("""
+        (def a (cell {:x 2}))
+        (def b (cell {:x 1}))
+        (def c (cell {:x 1}))
+        (def d (cell {:x 2}))
+        (compress (merge [a b c d (cell {:x 1})]))
+    """)
+    assert result["ok"]["data"] == {"x": 1}
+    tie = ev("(compress (merge [(cell {:x 2}) (cell {:x 1})]))")
+    assert tie["ok"]["data"] == {"x": 2}
+
 def test_packet():
     result = ev('(packet {:data "test"})')
     assert result["__type__"] == "packet"
     assert "hash" in result
 
+def test_hash_builtin():
+    assert ev('(hash "abc")') == ev('(hash "abc")')
+    assert ev("(hash 1)") != ev("(hash T)")
+    assert len(ev("(hash [1 2])")) == 12
+
+def test_hash_signed_zero():
+    # 0.0 == -0.0, but they print differently and so hash differently —
+    # in either order, whatever was hashed earlier in the process
+    assert ev("(hash -0.0)") != ev("(hash 0.0)")
+    assert ev("(hash 0.0)") != ev("(hash -0.0)")
+
 
 # ─── Communication Intents ───────────────────────────────────────────────
 
@@ -509,17 +584,16 @@ def test_longform_positional_args():
 
 # ─── I/O ─────────────────────────────────────────────────────────────────
 
-def test_print(capsys):
-    ev("(print 42)")
-    assert capsys.readouterr().out.strip() == "42"
+def test_print():
+    # End-to-end smoke test; print renders each value via _format_val
+    out = ev_output('(print 42) (print "hello") (print T)')
+    assert out.split("\n") == ["42", "hello", "T", ""]
 
-def test_print_string(capsys):
-    ev('(print "hello")')
-    assert capsys.readouterr().out.strip() == "hello"
+def test_print_string():
+    assert _format_val("hello") == "hello"
 
-def test_print_bool(capsys):
-    ev("(print T)")
-    assert capsys.readouterr().out.strip() == "T"
+def test_print_bool():
+    assert _format_val(True) == "T"
 
 
 # ─── Format Values ──────────────────────────────────────────────────────
@@ -565,14 +639,29 @@ def test_env_shadowing():
     assert env_get(parent, "x") == 10
 
 
+# ─── Compilation ─────────────────────────────────────────────────────────
+
+def test_compiled_node_reruns():
+    run = compile_node(parse(tokenize("(add x 1)"))[0])
+    assert run(make_env(default_env(), {"x": 1})) == 2
+    assert run(make_env(default_env(), {"x": 41})) == 42
+
+def test_compiled_matches_evaluate():
+    src = "(let [f (fn [n] (if (< n 2) n (* n 2)))] [(f 1) (f 5) {:k (f 3)}])"
+    node = parse(tokenize(src))[0]
+    assert compile_node(node)(default_env()) == evaluate(node, default_env())
+
+
 # ─── Error Locations ─────────────────────────────────────────────────────
 
+_RE_LOC = re.compile(r"line \d+, col \d+")
+
 def test_undefined_symbol_has_location():
-    with pytest.raises(NameError, match=r"line \d+, col \d+"):
+    with pytest.raises(NameError, match=_RE_LOC):
         ev("undefined_var")
 
 def test_not_callable_has_location():
-    with pytest.raises(RuntimeError, match=r"line \d+, col \d+"):
+    with pytest.raises(RuntimeError, match=_RE_LOC):
         ev("(42 1 2)")
 
 
@@ -584,11 +673,26 @@ def test_use_file(tmp_path):
     result = ev(f'(use "{mod_file}") (double 21)')
     assert result == 42
 
-def test_use_file_selective(tmp_path):
-    mod_file = tmp_path / "mymod.ht"
-    mod_file.write_text("(def a 10)\n(def b 20)\n")
-    result = ev(f'(use "{mod_file}" a) a')
+def mem_env(files):
+    """Default env whose (use "file") imports read from an in-memory table."""
+    env = default_env()
+    env["__file_loader__"] = files.get
+    return env
+
+def test_use_file_selective():
+    env = mem_env({"/mem/mymod.ht": "(def a 10)\n(def b 20)\n"})
+    result = ev('(use "/mem/mymod.ht" a) a', env)
     assert result == 10
+    assert "b" not in env
+
+def test_use_file_loader_in_fn_body():
+    # The loader is found through the env chain, not just the current frame
+    env = mem_env({"/mem/m.ht": "(def a 10)"})
+    assert ev('(def (f) (do (use "/mem/m.ht") a)) (f)', env) == 10
+
+def test_use_file_loader_missing():
+    with pytest.raises(RuntimeError, match="File not found"):
+        ev('(use "/mem/missing.ht")', mem_env({}))
 
 def test_use_file_not_found():
     with pytest.raises(RuntimeError, match="File not found"):
@@ -643,11 +747,21 @@ def test_macro_does_not_eval_args():
     assert result == 15
 
 
-def test_use_file_circular(tmp_path):
-    # Two files that try to import each other — should not infinite loop
-    a = tmp_path / "a.ht"
-    b = tmp_path / "b.ht"
-    a.write_text(f'(use "{b}")\n(def from-a 1)\n')
-    b.write_text(f'(use "{a}")\n(def from-b 2)\n')
-    result = ev(f'(use "{a}") from-a')
+def test_use_file_circular():
+    # Two files that try to import each other — should not infinite loop.
+    # b.ht is imported by a relative path, resolved against a.ht's directory
+    env = mem_env({
+        "/mem/a.ht": '(use "b.ht")\n(def from-a 1)\n',
+        "/mem/b.ht": '(use "/mem/a.ht")\n(def from-b 2)\n',
+    })
+    result = ev('(use "/mem/a.ht") from-a', env)
     assert result == 1
+    assert env["from-b"] == 2
+
+
+def test_default_env_is_fresh():
+    _, env = ev_env("(def add 1) (def fresh 2)")
+    assert env["add"] == 1
+    env2 = default_env()
+    assert "fresh" not in env2
+    assert ev("(add 1 2)", env2) == 3
@@ -1,29 +1,25 @@
 """Integration tests — run example .ht files and verify output."""
 
-import subprocess
 import os
+import subprocess
+import sys
+
 import pytest
 
+from compiler import htc
+from tests.conftest import run_htc
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-def run_ht(filename):
-    """Run a .ht file and return (stdout, stderr, returncode)."""
-    path = os.path.join(PROJECT_ROOT, "examples", filename)
-    result = subprocess.run(
-        ["python3", "-m", "compiler.htc", "run", path],
-        capture_output=True, text=True, cwd=PROJECT_ROOT,
-    )
-    return result.stdout, result.stderr, result.returncode
+def run_cmd(cmd_args):
+    """Run an htc command in-process and return (stdout, stderr, returncode)."""
+    return run_htc(*cmd_args)
 
 
-def run_cmd(cmd_args):
-    """Run an htc command and return (stdout, stderr, returncode)."""
-    result = subprocess.run(
-        ["python3", "-m", "compiler.htc"] + cmd_args,
-        capture_output=True, text=True, cwd=PROJECT_ROOT,
-    )
-    return result.stdout, result.stderr, result.returncode
+def run_ht(filename):
+    """Run a .ht file and return (stdout, stderr, returncode)."""
+    return run_cmd(["run", os.path.join(PROJECT_ROOT, "examples", filename)])
 
 
 # ─── Example files run without error ─────────────────────────────────────
@@ -113,3 +109,27 @@ def test_compile_js():
 def test_no_args_shows_usage():
     out, err, rc = run_cmd([])
     assert rc == 1
+
+@pytest.mark.parametrize("code, rc", [(None, 0), (0, 0), (3, 3), ("boom", 1)])
+def test_run_htc_exit_codes(code, rc, monkeypatch):
+    # Same mapping a real process applies to sys.exit(code)
+    def main():
+        sys.exit(code)
+    monkeypatch.setattr(htc, "main", main)
+    out, err, got = run_htc.__wrapped__()
+    assert got == rc
+    assert ("boom" in err) == (code == "boom")
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("entry", [
+    ["-m", "compiler.htc"],
+    [os.path.join(PROJECT_ROOT, "compiler", "htc.py")],
+], ids=["module", "script"])
+def test_cli_starts_and_exits_1_without_args(entry, tmp_path):
+    # Real process: covers the __main__ guard, and (run as a script from
+    # elsewhere) the sys.path insert that makes `compiler` importable
+    cwd = PROJECT_ROOT if entry[0] == "-m" else str(tmp_path)
+    r = subprocess.run([sys.executable, *entry], capture_output=True, text=True, cwd=cwd)
+    assert r.returncode == 1, r.stderr
+    assert "Usage:" in r.stdout
@@ -1,5 +1,7 @@
 """Tests for the HiveSpeak lexer."""
 
+from functools import lru_cache
+
 import pytest
 from compiler.lexer import tokenize, T_INT, T_FLOAT, T_STRING, T_BOOL, T_NULL
 from compiler.lexer import T_SYM, T_KW, T_HASH, T_LPAREN, T_RPAREN
@@ -7,9 +9,15 @@ from compiler.lexer import T_LBRACK, T_RBRACK, T_LBRACE, T_RBRACE
 from compiler.lexer import T_QUOTE, T_UNQUOTE, T_SPLICE, T_PIPE, T_EOF
 
 
+@lru_cache(maxsize=4096)
+def _tokenize_cached(src):
+    """Lex each distinct source once per session; tuple so hits can't be mutated."""
+    return tuple(tokenize(src))
+
+
 def toks(src):
     """Tokenize and strip EOF for easier assertions."""
-    return [(t, v) for t, v, _l, _c in tokenize(src) if t != T_EOF]
+    return [(t, v) for t, v, _l, _c in _tokenize_cached(src) if t != T_EOF]
 
 
 def tok_types(src):
@@ -18,117 +26,76 @@ def tok_types(src):
 
 # ─── Literals ─────────────────────────────────────────────────────────────
 
-def test_integer():
-    assert toks("42") == [(T_INT, 42)]
-
-def test_negative_integer():
-    assert toks("-7") == [(T_INT, -7)]
-
-def test_float():
-    assert toks("3.14") == [(T_FLOAT, 3.14)]
-
-def test_negative_float():
-    assert toks("-2.5") == [(T_FLOAT, -2.5)]
-
-def test_string():
-    assert toks('"hello"') == [(T_STRING, "hello")]
+@pytest.mark.parametrize("src, expected", [
+    ("42", (T_INT, 42)),
+    ("-7", (T_INT, -7)),
+    ("3.14", (T_FLOAT, 3.14)),
+    ("-2.5", (T_FLOAT, -2.5)),
+    ('"hello"', (T_STRING, "hello")),
+    ("T", (T_BOOL, True)),
+    ("F", (T_BOOL, False)),
+    ("N", (T_NULL, None)),
+])
+def test_atom(src, expected):
+    assert toks(src) == [expected]
 
 def test_string_escapes():
     assert toks(r'"a\nb"') == [(T_STRING, "a\nb")]
     assert toks(r'"a\tb"') == [(T_STRING, "a\tb")]
     assert toks(r'"a\"b"') == [(T_STRING, 'a"b')]
 
-def test_bool_true():
-    assert toks("T") == [(T_BOOL, True)]
-
-def test_bool_false():
-    assert toks("F") == [(T_BOOL, False)]
-
-def test_null():
-    assert toks("N") == [(T_NULL, None)]
-
-
-# ─── Symbols & Keywords ──────────────────────────────────────────────────
-
-def test_symbol():
-    assert toks("foo") == [(T_SYM, "foo")]
-
-def test_symbol_with_special_chars():
-    assert toks("fn?") == [(T_SYM, "fn?")]
-    assert toks("assert!") == [(T_SYM, "assert!")]
-    assert toks("|>") == [(T_PIPE, "|>")]
-
-def test_keyword():
-    assert toks(":name") == [(T_KW, "name")]
-    assert toks(":age") == [(T_KW, "age")]
-
-def test_hash():
-    assert toks("#abc123") == [(T_HASH, "abc123")]
-
-
-# ─── Delimiters ──────────────────────────────────────────────────────────
-
-def test_parens():
-    assert tok_types("()") == [T_LPAREN, T_RPAREN]
-
-def test_brackets():
-    assert tok_types("[]") == [T_LBRACK, T_RBRACK]
-
-def test_braces():
-    assert tok_types("{}") == [T_LBRACE, T_RBRACE]
-
-def test_quote():
-    assert tok_types("'x") == [T_QUOTE, T_SYM]
-
-def test_unquote():
-    assert tok_types(",x") == [T_UNQUOTE, T_SYM]
-
-def test_splice():
-    assert tok_types(",@x") == [T_SPLICE, T_SYM]
-
-def test_tilde_as_symbol():
-    assert toks("~") == [(T_SYM, "~")]
-    # ~ inside an s-expression
-    result = toks("(~ :temp 68)")
-    assert result[1] == (T_SYM, "~")
-
-
-# ─── Whitespace & Comments ───────────────────────────────────────────────
-
-def test_whitespace_ignored():
-    assert toks("  42  ") == [(T_INT, 42)]
-
-def test_comments_ignored():
-    assert toks("; this is a comment\n42") == [(T_INT, 42)]
-
-def test_inline_comment():
-    assert toks("42 ; the answer") == [(T_INT, 42)]
-
-
-# ─── Composite ───────────────────────────────────────────────────────────
-
-def test_sexpr():
-    result = toks("(add 1 2)")
-    assert result == [
-        (T_LPAREN, "("), (T_SYM, "add"), (T_INT, 1), (T_INT, 2), (T_RPAREN, ")")
-    ]
+def test_string_escape_runs():
+    assert toks(r'"\\\\n"') == [(T_STRING, "\\\\n")]
+    assert toks(r'"x\\"') == [(T_STRING, "x\\")]
+    assert toks(r'"\q\n\\\t"') == [(T_STRING, "q\n\\\t")]
+
+
+# ─── Token table ─────────────────────────────────────────────────────────
+# Plain (source, tokens) cases checked in one pass, EOF stripped. Cases
+# needing their own diagnostics (locations, errors) stay separate tests
+
+_TOKEN_CASES = [
+    # symbols & keywords
+    ("foo", [(T_SYM, "foo")]),
+    ("fn?", [(T_SYM, "fn?")]),
+    ("assert!", [(T_SYM, "assert!")]),
+    ("|>", [(T_PIPE, "|>")]),
+    (":name", [(T_KW, "name")]),
+    (":age", [(T_KW, "age")]),
+    ("#abc123", [(T_HASH, "abc123")]),
+    ("~", [(T_SYM, "~")]),
+    # delimiters & prefixes
+    ("()", [(T_LPAREN, "("), (T_RPAREN, ")")]),
+    ("[]", [(T_LBRACK, "["), (T_RBRACK, "]")]),
+    ("{}", [(T_LBRACE, "{"), (T_RBRACE, "}")]),
+    ("'x", [(T_QUOTE, "'"), (T_SYM, "x")]),
+    (",x", [(T_UNQUOTE, ","), (T_SYM, "x")]),
+    (",@x", [(T_SPLICE, ",@"), (T_SYM, "x")]),
+    # whitespace & comments
+    ("  42  ", [(T_INT, 42)]),
+    ("; this is a comment\n42", [(T_INT, 42)]),
+    ("42 ; the answer", [(T_INT, 42)]),
+    ("", []),
+    ("; nothing here", []),
+    # composite
+    ("(add 1 2)", [(T_LPAREN, "("), (T_SYM, "add"), (T_INT, 1), (T_INT, 2), (T_RPAREN, ")")]),
+    ("(~ :temp 68)", [(T_LPAREN, "("), (T_SYM, "~"), (T_KW, "temp"), (T_INT, 68), (T_RPAREN, ")")]),
+    ("[1 2 3]", [(T_LBRACK, "["), (T_INT, 1), (T_INT, 2), (T_INT, 3), (T_RBRACK, "]")]),
+    ("{:a 1}", [(T_LBRACE, "{"), (T_KW, "a"), (T_INT, 1), (T_RBRACE, "}")]),
+    ('42 "hi" T', [(T_INT, 42), (T_STRING, "hi"), (T_BOOL, True)]),
+]
+
+
+def test_token_table():
+    for src, expected in _TOKEN_CASES:
+        got = toks(src)
+        if got != expected:
+            pytest.fail(f"tokenize({src!r}) = {got!r}, expected {expected!r}")
 
 def test_nested_sexpr():
     result = toks("(add (* 2 3) 4)")
     assert len(result) == 9
 
-def test_list_literal():
-    result = toks("[1 2 3]")
-    assert result == [
-        (T_LBRACK, "["), (T_INT, 1), (T_INT, 2), (T_INT, 3), (T_RBRACK, "]")
-    ]
-
-def test_map_literal():
-    result = toks("{:a 1}")
-    assert result == [
-        (T_LBRACE, "{"), (T_KW, "a"), (T_INT, 1), (T_RBRACE, "}")
-    ]
-
 
 # ─── Source Location Tracking ────────────────────────────────────────────
 
@@ -140,6 +107,10 @@ def test_line_col_tracking():
     assert tokens[3] == (T_INT, 1, 2, 4)
     assert tokens[4] == (T_INT, 2, 2, 6)
 
+def test_crlf_line_col_tracking():
+    src = "42\n(+ 1 2)\n; c\n:k"
+    assert tokenize(src.replace("\n", "\r\n")) == tokenize(src)
+
 
 # ─── Errors ──────────────────────────────────────────────────────────────
 
@@ -154,15 +125,17 @@ def test_unexpected_char():
 
 # ─── Edge Cases ──────────────────────────────────────────────────────────
 
-def test_empty_source():
-    assert toks("") == []
-
-def test_only_comments():
-    assert toks("; nothing here") == []
-
-def test_pipe_operator():
-    assert toks("|>") == [(T_PIPE, "|>")]
-
-def test_multiple_expressions():
-    result = toks("42 \"hi\" T")
-    assert result == [(T_INT, 42), (T_STRING, "hi"), (T_BOOL, True)]
+def test_every_delimiter_ends_a_symbol():
+    from compiler.lexer import DELIMITERS
+    for d in DELIMITERS:
+        for prefix in ("ab", ":ab", "#ab"):
+            tok = tokenize(prefix + d + d)[0]
+            assert tok[1] == "ab", (prefix, d)
+
+def test_read_source_translates_newlines(tmp_path):
+    from compiler.lexer import read_source
+    path = tmp_path / "crlf.ht"
+    path.write_bytes('(print "é")\r\n; c\r42\n'.encode("utf-8"))
+    source = read_source(str(path))
+    assert source == '(print "é")\n; c\n42\n'
+    assert tokenize(source)[-2] == (T_INT, 42, 3, 1)
@@ -0,0 +1,46 @@
+"""Tests for the on-disk parse cache."""
+
+import os
+import pickle
+
+from compiler.lexer import tokenize
+from compiler.parser import parse
+from compiler.parse_cache import get_or_parse, cache_key, _evict
+
+
+SRC = "(def (f x) [x 'y {:k #h}]) (f 1)"
+
+
+def test_miss_then_hit(tmp_path):
+    ast = get_or_parse(SRC, str(tmp_path))
+    assert ast == parse(tokenize(SRC))
+    entry = tmp_path / (cache_key(SRC) + ".pkl")
+    assert entry.exists()
+    assert get_or_parse(SRC, str(tmp_path)) == ast
+
+
+def test_corrupt_entry_falls_back(tmp_path):
+    (tmp_path / (cache_key(SRC) + ".pkl")).write_bytes(b"not a pickle")
+    assert get_or_parse(SRC, str(tmp_path)) == parse(tokenize(SRC))
+
+
+def test_entry_without_header_is_not_loaded(tmp_path):
+    # A valid pickle that isn't ours must not be trusted as an AST
+    (tmp_path / (cache_key(SRC) + ".pkl")).write_bytes(pickle.dumps(["bogus"]))
+    assert get_or_parse(SRC, str(tmp_path)) == parse(tokenize(SRC))
+    assert get_or_parse(SRC, str(tmp_path)) == parse(tokenize(SRC))
+
+
+def test_disabled_by_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("HIVESPEAK_NO_CACHE", "1")
+    assert get_or_parse(SRC, str(tmp_path)) == parse(tokenize(SRC))
+    assert os.listdir(tmp_path) == []
+
+
+def test_evict_oldest(tmp_path):
+    for i in range(5):
+        p = tmp_path / f"{i}.pkl"
+        p.write_bytes(b"")
+        os.utime(p, (i, i))
+    _evict(str(tmp_path), max_entries=3)
+    assert sorted(os.listdir(tmp_path)) == ["2.pkl", "3.pkl", "4.pkl"]
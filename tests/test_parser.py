@@ -1,15 +1,22 @@
 """Tests for the HiveSpeak parser."""
 
+from functools import lru_cache
+
 import pytest
-from compiler.lexer import tokenize
-from compiler.parser import parse, node_loc
+from compiler.lexer import tokenize, tokenize_iter
+from compiler.parser import parse, node_loc, flatten
 
 
-def ast(src):
-    """Parse source and return AST node list."""
+@lru_cache(maxsize=4096)
+def _parse_cached(src):
     return parse(tokenize(src))
 
 
+def ast(src):
+    """Parse source and return AST node list (memoized per distinct source)."""
+    return _parse_cached(src)
+
+
 def ast1(src):
     """Parse source expecting a single expression, return that node."""
     nodes = ast(src)
@@ -22,32 +29,31 @@ def nv(node):
     return (node[0], node[1])
 
 
-# ─── Atoms ────────────────────────────────────────────────────────────────
-
-def test_int():
-    assert nv(ast1("42")) == ("INT", 42)
-
-def test_float():
-    assert nv(ast1("3.14")) == ("FLOAT", 3.14)
+def shape(node):
+    """Whole AST node as nested (type, value) pairs, without source locations."""
+    tag, value = node[0], node[1]
+    if type(value) is list:
+        return (tag, [shape(c) for c in value])
+    if type(value) is tuple:
+        return (tag, shape(value))
+    return (tag, value)
 
-def test_string():
-    assert nv(ast1('"hello"')) == ("STR", "hello")
 
-def test_bool():
-    assert nv(ast1("T")) == ("BOOL", True)
-    assert nv(ast1("F")) == ("BOOL", False)
-
-def test_null():
-    assert nv(ast1("N")) == ("NULL", None)
-
-def test_symbol():
-    assert nv(ast1("foo")) == ("SYM", "foo")
-
-def test_keyword():
-    assert nv(ast1(":name")) == ("KW", "name")
+# ─── Atoms ────────────────────────────────────────────────────────────────
 
-def test_hash():
-    assert nv(ast1("#abc")) == ("HASH", "abc")
+@pytest.mark.parametrize("src, expected", [
+    ("42", ("INT", 42)),
+    ("3.14", ("FLOAT", 3.14)),
+    ('"hello"', ("STR", "hello")),
+    ("T", ("BOOL", True)),
+    ("F", ("BOOL", False)),
+    ("N", ("NULL", None)),
+    ("foo", ("SYM", "foo")),
+    (":name", ("KW", "name")),
+    ("#abc", ("HASH", "abc")),
+])
+def test_atom(src, expected):
+    assert nv(ast1(src)) == expected
 
 
 # ─── Source locations on atoms ───────────────────────────────────────────
@@ -65,74 +71,33 @@ def test_multiline_loc():
     assert node_loc(add_sym) == (2, 2)
 
 
-# ─── Compound ────────────────────────────────────────────────────────────
-
-def test_sexpr():
-    node = ast1("(add 1 2)")
-    assert node[0] == "SEXPR"
-    children = node[1]
-    assert nv(children[0]) == ("SYM", "add")
-    assert nv(children[1]) == ("INT", 1)
-    assert nv(children[2]) == ("INT", 2)
-
-def test_nested_sexpr():
-    node = ast1("(add (* 2 3) 4)")
-    assert node[0] == "SEXPR"
-    inner = node[1][1]
-    assert inner[0] == "SEXPR"
-    assert nv(inner[1][0]) == ("SYM", "*")
-    assert nv(inner[1][1]) == ("INT", 2)
-    assert nv(inner[1][2]) == ("INT", 3)
-
-def test_list():
-    node = ast1("[1 2 3]")
-    assert node[0] == "LIST"
-    assert [nv(c) for c in node[1]] == [("INT", 1), ("INT", 2), ("INT", 3)]
-
-def test_empty_list():
-    node = ast1("[]")
-    assert node[0] == "LIST"
-    assert node[1] == []
-
-def test_map():
-    node = ast1("{:a 1}")
-    assert node[0] == "MAP"
-    assert nv(node[1][0]) == ("KW", "a")
-    assert nv(node[1][1]) == ("INT", 1)
-
-def test_empty_map():
-    node = ast1("{}")
-    assert node[0] == "MAP"
-    assert node[1] == []
-
-def test_quote():
-    node = ast1("'x")
-    assert node[0] == "QUOTE"
-    assert nv(node[1]) == ("SYM", "x")
-
-def test_unquote():
-    node = ast1(",x")
-    assert node[0] == "UNQUOTE"
-    assert nv(node[1]) == ("SYM", "x")
-
-def test_splice():
-    node = ast1(",@x")
-    assert node[0] == "SPLICE"
-    assert nv(node[1]) == ("SYM", "x")
-
-def test_tilde_as_symbol():
-    node = ast1("(~ :temp 68)")
-    assert node[0] == "SEXPR"
-    assert nv(node[1][0]) == ("SYM", "~")
+# ─── Shape table ─────────────────────────────────────────────────────────
+# Plain (source, AST shape) cases checked in one pass
 
+_SHAPE_CASES = [
+    ("(add 1 2)", [("SEXPR", [("SYM", "add"), ("INT", 1), ("INT", 2)])]),
+    ("(add (* 2 3) 4)", [("SEXPR", [
+        ("SYM", "add"), ("SEXPR", [("SYM", "*"), ("INT", 2), ("INT", 3)]), ("INT", 4)])]),
+    ("[1 2 3]", [("LIST", [("INT", 1), ("INT", 2), ("INT", 3)])]),
+    ("[]", [("LIST", [])]),
+    ("{:a 1}", [("MAP", [("KW", "a"), ("INT", 1)])]),
+    ("{}", [("MAP", [])]),
+    ("'x", [("QUOTE", ("SYM", "x"))]),
+    (",x", [("UNQUOTE", ("SYM", "x"))]),
+    (",@x", [("SPLICE", ("SYM", "x"))]),
+    ("(~ :temp 68)", [("SEXPR", [("SYM", "~"), ("KW", "temp"), ("INT", 68)])]),
+    ("(|> x f g)", [("SEXPR", [("SYM", "|>"), ("SYM", "x"), ("SYM", "f"), ("SYM", "g")])]),
+    ("42 (add 1 2)", [("INT", 42), ("SEXPR", [("SYM", "add"), ("INT", 1), ("INT", 2)])]),
+    ("(a (b (c (d 1))))", [("SEXPR", [("SYM", "a"), ("SEXPR", [("SYM", "b"), ("SEXPR", [
+        ("SYM", "c"), ("SEXPR", [("SYM", "d"), ("INT", 1)])])])])]),
+]
 
-# ─── Multiple expressions ───────────────────────────────────────────────
 
-def test_multiple_top_level():
-    nodes = ast("42 (add 1 2)")
-    assert len(nodes) == 2
-    assert nv(nodes[0]) == ("INT", 42)
-    assert nodes[1][0] == "SEXPR"
+def test_shape_table():
+    for src, expected in _SHAPE_CASES:
+        got = [shape(n) for n in ast(src)]
+        if got != expected:
+            pytest.fail(f"parse({src!r}) = {got!r}, expected {expected!r}")
 
 
 # ─── Complex forms ───────────────────────────────────────────────────────
@@ -162,11 +127,6 @@ def test_if():
     assert node[0] == "SEXPR"
     assert len(node[1]) == 4  # if, T, 1, 2
 
-def test_pipe():
-    node = ast1("(|> x f g)")
-    assert node[0] == "SEXPR"
-    assert nv(node[1][0]) == ("SYM", "|>")
-
 
 # ─── Errors ──────────────────────────────────────────────────────────────
 
@@ -181,14 +141,24 @@ def test_unexpected_rparen():
 
 # ─── Deep nesting ────────────────────────────────────────────────────────
 
-def test_deeply_nested():
-    src = "(a (b (c (d 1))))"
-    node = ast1(src)
-    assert node[0] == "SEXPR"
-    level2 = node[1][1]
-    assert level2[0] == "SEXPR"
-    level3 = level2[1][1]
-    assert level3[0] == "SEXPR"
-    level4 = level3[1][1]
-    assert level4[0] == "SEXPR"
-    assert nv(level4[1][1]) == ("INT", 1)
+def test_nesting_beyond_recursion_limit():
+    import sys
+    depth = sys.getrecursionlimit() * 2
+    node = ast1("[" * depth + "'x" + "]" * depth)
+    for _ in range(depth):
+        assert node[0] == "LIST" and len(node[1]) == 1
+        node = node[1][0]
+    assert node[0] == "QUOTE"
+    assert nv(node[1]) == ("SYM", "x")
+
+def test_parse_token_stream():
+    src = "(def (f x) [x 'y {:k #h}]) (|> 1 f) ; done"
+    assert parse(tokenize_iter(src)) == ast(src)
+
+
+def test_flatten_preorder():
+    tags, values, locs, depths = flatten(ast("(f 'x [1 N]) :k"))
+    assert tags == ["SEXPR", "SYM", "QUOTE", "SYM", "LIST", "INT", "NULL", "KW"]
+    assert values == [None, "f", None, "x", None, 1, None, "k"]
+    assert depths == [0, 1, 1, 2, 1, 2, 2, 0]
+    assert locs[0] == (1, 1) and locs[-1] == (1, 14)
@@ -1,98 +1,178 @@
 """Transpiler output verification — compile .ht to Python/JS, run it, compare output."""
 
-import subprocess
+import contextlib
+import io
 import os
+import shutil
+import subprocess
+import tempfile
+import traceback
+from functools import lru_cache
+
 import pytest
 
+from compiler import htc
+from tests.conftest import run_htc
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES_DIR = os.path.join(PROJECT_ROOT, "examples")
+
+# Resolved once; JS tests are skipped where node isn't installed
+NODE = shutil.which("node")
+requires_node = pytest.mark.skipif(NODE is None, reason="node not installed")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _warmup():
+    """Import the code generators before the first test, not inside it.
+
+    The compiles are cached by _compile, so the tests reuse them for free.
+    """
+    for target in ("python", "js"):
+        _compile("basics.ht", target)
 
 
 def _interpret(filename):
     """Run .ht file with interpreter, return stdout."""
-    path = os.path.join(PROJECT_ROOT, "examples", filename)
-    r = subprocess.run(
-        ["python3", "-m", "compiler.htc", "run", path],
-        capture_output=True, text=True, cwd=PROJECT_ROOT,
-    )
-    assert r.returncode == 0, f"Interpreter failed: {r.stderr}"
-    return r.stdout
+    path = os.path.join(EXAMPLES_DIR, filename)
+    out, err, rc = run_htc("run", path)
+    assert rc == 0, f"Interpreter failed: {err}"
+    return out
+
+
+@lru_cache(maxsize=None)
+def _compile(filename, target):
+    """Compile .ht to target ("python" or "js"), return the generated source.
+
+    Calls htc.compile_file directly, so the source comes back as a
+    string rather than through captured stdout.
+    """
+    path = os.path.join(EXAMPLES_DIR, filename)
+    try:
+        return htc.compile_file(path, target)
+    except Exception:
+        pytest.fail(f"{target} compile failed: {traceback.format_exc()}")
 
 
 def _compile_and_run_python(filename):
     """Compile .ht to Python, run generated code, return stdout."""
-    path = os.path.join(PROJECT_ROOT, "examples", filename)
-    # Compile
-    comp = subprocess.run(
-        ["python3", "-m", "compiler.htc", "compile", path, "python"],
-        capture_output=True, text=True, cwd=PROJECT_ROOT,
-    )
-    assert comp.returncode == 0, f"Python compile failed: {comp.stderr}"
-    # Run generated Python
-    run = subprocess.run(
-        ["python3", "-c", comp.stdout],
-        capture_output=True, text=True, cwd=PROJECT_ROOT,
+    source = _compile(filename, "python")
+    # Run generated Python in a fresh module namespace
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            exec(compile(source, f"<{filename}.py>", "exec"), {"__name__": "__main__"})
+    except Exception:
+        pytest.fail(f"Generated Python failed: {traceback.format_exc()}\n{source[-500:]}")
+    return out.getvalue()
+
+
+# One node process serves every JS test: it reads script paths on stdin, runs
+# each in a fresh vm context, and ends that script's output with a marker line
+_NODE_DRIVER = r"""
+const fs = require("fs"), vm = require("vm");
+require("readline").createInterface({input: process.stdin}).on("line", (path) => {
+  let status = "ok";
+  try {
+    vm.runInNewContext(fs.readFileSync(path, "utf8"), {console}, {filename: path});
+  } catch (e) {
+    status = "error";
+    console.log((e && e.stack) || String(e));
+  }
+  console.log("__HS_END__ " + status);
+});
+"""
+
+
+@pytest.fixture(scope="module")
+def node():
+    """Run a JS file in the shared node process, return (stdout, ok)."""
+    proc = subprocess.Popen(
+        [NODE, "-e", _NODE_DRIVER],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=PROJECT_ROOT,
     )
-    assert run.returncode == 0, f"Generated Python failed: {run.stderr}\n{comp.stdout[-500:]}"
-    return run.stdout
 
+    def run(script):
+        proc.stdin.write(script + "\n")
+        proc.stdin.flush()
+        lines = []
+        for line in proc.stdout:
+            if line.startswith("__HS_END__ "):
+                return "".join(lines), line.split()[1] == "ok"
+            lines.append(line)
+        pytest.fail(f"node driver exited unexpectedly:\n{''.join(lines)}")
+
+    yield run
+    proc.stdin.close()
+    proc.wait()
 
-def _compile_and_run_js(filename):
+
+def _compile_and_run_js(filename, node):
     """Compile .ht to JS, run generated code, return stdout."""
-    path = os.path.join(PROJECT_ROOT, "examples", filename)
-    # Compile
-    comp = subprocess.run(
-        ["python3", "-m", "compiler.htc", "compile", path, "js"],
-        capture_output=True, text=True, cwd=PROJECT_ROOT,
-    )
-    assert comp.returncode == 0, f"JS compile failed: {comp.stderr}"
-    # Run generated JS
-    run = subprocess.run(
-        ["node", "-e", comp.stdout],
-        capture_output=True, text=True, cwd=PROJECT_ROOT,
-    )
-    assert run.returncode == 0, f"Generated JS failed: {run.stderr}\n{comp.stdout[-500:]}"
-    return run.stdout
+    return _run_js(_compile(filename, "js"), os.path.splitext(filename)[0], node)
 
 
-# ─── Python transpiler verification ──────────────────────────────────────
+def _run_js(source, name, node):
+    """Run generated JS source in the shared node process, return stdout."""
+    # Run generated JS from a script file rather than a huge -e argument
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, name + ".js")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(source)
+        out, ok = node(script)
+    assert ok, f"Generated JS failed: {out}\n{source[-500:]}"
+    return out
+
 
-def test_python_basics():
-    interp = _interpret("basics.ht")
-    compiled = _compile_and_run_python("basics.ht")
-    assert compiled.strip() == interp.strip()
+def _norm(output):
+    """Output as a tuple of right-stripped lines, for line-wise comparison."""
+    return tuple(line.rstrip() for line in output.splitlines())
 
-def test_python_fibonacci():
-    interp = _interpret("fibonacci.ht")
-    compiled = _compile_and_run_python("fibonacci.ht")
-    assert compiled.strip() == interp.strip()
 
-def test_python_calculator():
-    interp = _interpret("calculator.ht")
-    compiled = _compile_and_run_python("calculator.ht")
-    assert compiled.strip() == interp.strip()
+# ─── Python transpiler verification ──────────────────────────────────────
 
-def test_python_conversation():
-    interp = _interpret("conversation.ht")
-    compiled = _compile_and_run_python("conversation.ht")
-    assert compiled.strip() == interp.strip()
+# Examples whose generated Python must print exactly what the interpreter does
+EXAMPLES = ["basics.ht", "fibonacci.ht", "calculator.ht", "conversation.ht", "planning.ht"]
 
-def test_python_planning():
-    interp = _interpret("planning.ht")
-    compiled = _compile_and_run_python("planning.ht")
-    assert compiled.strip() == interp.strip()
+
+@pytest.mark.parametrize("filename", EXAMPLES)
+def test_python_matches_interpreter(filename):
+    interp = _interpret(filename)
+    compiled = _compile_and_run_python(filename)
+    assert _norm(compiled) == _norm(interp)
 
 
 # ─── JavaScript transpiler verification ──────────────────────────────────
 
-def test_js_fibonacci():
+@requires_node
+def test_js_fibonacci(node):
     """JS fibonacci produces correct computation values."""
-    output = _compile_and_run_js("fibonacci.ht")
+    output = _compile_and_run_js("fibonacci.ht", node)
     assert "55" in output
     assert "6765" in output
     assert "832040" in output
 
-def test_js_basics_runs():
+@requires_node
+def test_js_basics_runs(node):
     """JS basics compiles and runs without errors."""
-    output = _compile_and_run_js("basics.ht")
+    output = _compile_and_run_js("basics.ht", node)
     assert "42" in output
     assert "hello HiveSpeak" in output
+
+@requires_node
+def test_js_fmt_matches_interpreter(node):
+    """fmt substitutes each arg once, left to right, in both runtimes."""
+    from compiler.lexer import tokenize_iter
+    from compiler.parser import parse
+    from compiler.targets.to_js import compile_to_js
+    src = """
+        (print (fmt "{} {}" "{}" 1))
+        (print (fmt "a{}b{}c" "$&"))
+        (print (fmt "{}" 1 2))
+    """
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        htc.run_source(src)
+    assert _norm(out.getvalue()) == ("{} 1", "a$&b{}c", "1")
+    compiled = _run_js(compile_to_js(parse(tokenize_iter(src))), "fmt", node)
+    assert _norm(compiled) == _norm(out.getvalue())